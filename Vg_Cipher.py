@@ -7,9 +7,38 @@ from utilities import get_positions
 from utilities import clean_text
 from utilities import insert_positions
 from utilities import ENGLISH_FREQ
-from utilities import compare_texts
 import math
+import os
+import mmap
+import heapq
+import signal
+import time
+import random
+import sys
+import argparse
+import json
+import hashlib
+import codecs
+import re
+import struct
+from array import array
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import wait
+from concurrent.futures import FIRST_COMPLETED
 from utilities import get_chars
+from utilities import get_index_map
+import utilities
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    import resource
+except ImportError:
+    resource = None
 class Cryptanalysis:
     """
     ----------------------------------------------------
@@ -23,7 +52,7 @@ class Cryptanalysis:
         """
         ----------------------------------------------------
         Static Method
-        Parameters:   text(str)
+        Parameters:   text(str or CiphertextProfile)
                       base_type(str): default = None
         Return:       I (float): Index of Coincidence
         Description:  Computes and returns the index of coincidence 
@@ -31,6 +60,8 @@ class Cryptanalysis:
         Asserts:      text is a string
         ----------------------------------------------------
         """
+        if isinstance(text,CiphertextProfile):
+            return text.get_ioc()
         if len(text) < 1:
             return 0.0
 
@@ -59,7 +90,7 @@ class Cryptanalysis:
         """
         ----------------------------------------------------
         Static method
-        Parameters:   ciphertext(str)
+        Parameters:   ciphertext(str or CiphertextProfile)
         Return:       list of two key lengths [int,int]
         Description:  Uses Friedman's test to compute key length
                       returns best two candidates for key length
@@ -71,12 +102,32 @@ class Cryptanalysis:
         Asserts:      ciphertext is a non-empty string
         ----------------------------------------------------
         """
+        if isinstance(ciphertext,CiphertextProfile):
+            if len(ciphertext.get_text()) < 1:
+                return [0,0]
+            n = ciphertext.get_length()
+            I = ciphertext.get_ioc() if n > 0 else 0.0
+            return Cryptanalysis._friedman_lengths(I,n)
         if len(ciphertext) < 1 :
             return [0,0]
         un = get_chars('nonalpha')+' '+'\n'+'\t'
         ciphertext = clean_text(ciphertext,un)
         n = len(ciphertext)
         I = Cryptanalysis.IOC(ciphertext)
+        return Cryptanalysis._friedman_lengths(I,n)
+
+    @staticmethod
+    def _friedman_lengths(I,n):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   I (float): index of coincidence
+                      n (int): length of the cleaned ciphertext
+        Return:       list of two key lengths [int,int]
+        Description:  Private helper function
+                      Friedman's formula, ordered as in Cryptanalysis.friedman
+        ----------------------------------------------------
+        """
         k = (0.0265*n) / ((0.065-I) + (n*I-n*0.0385))
         if round(k) > k:
             return [math.ceil(k),math.floor(k)]
@@ -89,14 +140,23 @@ class Cryptanalysis:
 
         """
         ----------------------------------------------------
-        Parameters:   text (str)
+        Parameters:   text (str or CiphertextProfile)
+                      language (str or LanguageModel): default = 'English'
         Return:       result (float)
         Description:  Calculates the Chi-squared statistics 
                       for given text
                       Only alpha characters are considered
+                      With a LanguageModel: compared to its unigram table,
+                          over the characters of its alphabet
         Asserts:      text is a string
         ----------------------------------------------------
         """
+        if isinstance(language,LanguageModel):
+            if isinstance(text,CiphertextProfile):
+                text = text.get_text()
+            return language.chi_squared(text)
+        if isinstance(text,CiphertextProfile):
+            return text.get_chi_squared()
         if len(text) == 0:
             return -1.00
         i = len(text)
@@ -117,11 +177,483 @@ class Cryptanalysis:
             equation += f
         return equation
 
+    @staticmethod
+    def _ioc_counts(counts):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   counts (list): letter counts
+        Return:       I (float): Index of Coincidence
+        Description:  Private helper function
+                      Index of coincidence computed from a letter histogram
+        ----------------------------------------------------
+        """
+        n = sum(counts)
+        if n < 2:
+            return 0.0
+        return sum([x*(x-1) for x in counts]) / (n*n-n)
+
+    @staticmethod
+    def _chi_squared_counts(counts):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   counts (list): 26 letter counts (a to z)
+        Return:       result (float)
+        Description:  Private helper function
+                      Chi-squared statistics computed from a letter histogram
+                      returns -1.00 if the histogram is empty
+        ----------------------------------------------------
+        """
+        n = sum(counts)
+        if n == 0:
+            return -1.00
+        equation = 0.0
+        for i in range(26):
+            e = ENGLISH_FREQ[i]*n
+            equation += ((counts[i] - e)*(counts[i] - e)) / e
+        return equation
+
+    @staticmethod
+    def _best_shift(counts):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   counts (list): 26 letter counts of one ciphertext column
+        Return:       shift (int)
+        Description:  Private helper function
+                      Returns the shift whose decryption of the column
+                      has the lowest chi-squared value
+                          if equal, start with smaller shift
+        ----------------------------------------------------
+        """
+        shift = 0
+        minichi = -1
+        for s in range(26):
+            x = Cryptanalysis._chi_squared_counts(counts[s:] + counts[:s])
+            if minichi == -1 or x < minichi:
+                minichi = x
+                shift = s
+        return shift
+
+    @staticmethod
+    def rank_key_lengths(ciphertext,max_length=20):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   ciphertext (str or CiphertextProfile)
+                      max_length (int): default = 20
+        Return:       ranking (list): [[key_length,score],...]
+        Description:  Ranks every key length 1..max_length
+                      score is the average index of coincidence of the columns
+                          (English text scores about 0.065, random text 0.0385)
+                      Sorted by score (highest first),
+                          if equal, start with smaller key length
+                      Only English letters are considered (case insensitive)
+                      Uses NumPy bincounts with the numpy backend
+        Asserts:      max_length is a positive integer
+        ----------------------------------------------------
+        """
+        assert type(max_length) == int and max_length > 0, 'invalid max_length'
+        if not isinstance(ciphertext,CiphertextProfile):
+            ciphertext = CiphertextProfile(ciphertext)
+        ranking = []
+        for L in range(1,max_length+1):
+            counts = ciphertext.get_column_counts(L)
+            score = sum([Cryptanalysis._ioc_counts(col) for col in counts]) / L
+            ranking.append([L,score])
+        ranking.sort(key=lambda item: -item[1])
+        return ranking
+
+    @staticmethod
+    def sampled_friedman(filename,window=4096,precision=0.0005,samples=32,
+                         max_samples=65536,seed=0):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   filename (str): ciphertext file
+                      window (int): bytes per sample window, default = 4096
+                      precision (float): target half width of the IOC
+                          95% confidence interval, default = 0.0005
+                      samples (int): first number of windows, default = 32
+                      max_samples (int): default = 65536
+                      seed (int): default = 0
+        Return:       ioc (float), ioc_interval [low,high],
+                      key_length (float), key_length_interval [low,high]
+        Description:  Estimates the index of coincidence and Friedman's key length
+                      of a large file from random windows of the memory mapped file
+                      The IOC is the average window IOC, the interval is
+                          ioc +/- 1.96 standard errors
+                      The number of windows is doubled until the interval is
+                          within precision or max_samples is reached
+                      If that needs as many windows as the file has, the sampled
+                          windows are dropped and the whole file is read window
+                          by window instead: the IOC interval has zero width
+                          and the number of letters is exact
+                      Friedman's key length uses the estimated number of letters
+                          in the file, its interval is computed from the IOC interval
+                      Runtime depends on precision, not on the file size
+        Asserts:      file exists and window is a positive integer
+        ----------------------------------------------------
+        """
+        assert type(window) == int and window > 0, 'invalid window'
+        rng = random.Random(seed)
+        values = []
+        letters = 0
+        with open(filename,'rb') as infile:
+            size = os.fstat(infile.fileno()).st_size
+            if size == 0:
+                return 0.0,[0.0,0.0],0.0,[0.0,0.0]
+            data = mmap.mmap(infile.fileno(),0,access=mmap.ACCESS_READ)
+            try:
+                window = min(window,size)
+                windows = size // window
+                target = min(samples,max_samples,windows)
+                exhaustive = False
+                while True:
+                    if target >= windows:
+                        exhaustive = True
+                        values = []
+                        letters = 0
+                        starts = range(0,size,window)
+                    else:
+                        starts = [rng.randrange(size - window + 1) for _ in range(target - len(values))]
+                    for start in starts:
+                        codes = utilities.get_letter_codes(data[start:start+window])
+                        letters += len(codes)
+                        if len(codes) > 1:
+                            values.append(Cryptanalysis._ioc_counts([codes.count(i) for i in range(26)]))
+                        else:
+                            values.append(None)
+                    valid = [v for v in values if v is not None]
+                    m = len(valid)
+                    ioc = sum(valid) / m if m > 0 else 0.0
+                    if m > 1:
+                        var = sum([(v - ioc)*(v - ioc) for v in valid]) / (m - 1)
+                        half = 1.96*math.sqrt(var / m)
+                    else:
+                        half = float('inf')
+                    if exhaustive or half <= precision or target >= max_samples:
+                        break
+                    target = min(target*2,max_samples,windows)
+            finally:
+                data.close()
+        if exhaustive:
+            half = 0.0
+            n = letters
+        else:
+            n = letters / len(values) * (size / window)
+        interval = [ioc - half,ioc + half]
+        k = Cryptanalysis._friedman_value(ioc,n)
+        bounds = [Cryptanalysis._friedman_value(x,n) for x in interval]
+        return ioc,interval,k,[min(bounds),max(bounds)]
+
+    @staticmethod
+    def _friedman_value(I,n):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   I (float): index of coincidence
+                      n (float): number of letters
+        Return:       k (float): key length, inf if I is at or below random text
+        Description:  Private helper function
+                      Friedman's formula
+        ----------------------------------------------------
+        """
+        d = (0.065-I) + (n*I-n*0.0385)
+        if d <= 0:
+            return float('inf')
+        return (0.0265*n) / d
+
+    @staticmethod
+    def hamming_key_length(ciphertext,max_length=20):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   ciphertext (str or CiphertextProfile)
+                      max_length (int): default = 20
+        Return:       ranking (list): [[key_length,distance],...]
+        Description:  Ranks every key length k in 1..max_length using the
+                      normalized Hamming distance between consecutive k-sized blocks
+                          block 1 vs block 2, block 2 vs block 3, ...
+                      distance is the number of differing bits per letter
+                      (letters are compared as codes 0-25)
+                      Blocks are compared as big integers: one XOR and one popcount
+                      Sorted by distance (lowest first),
+                          if equal, start with smaller key length
+        Asserts:      max_length is a positive integer
+        ----------------------------------------------------
+        """
+        assert type(max_length) == int and max_length > 0, 'invalid max_length'
+        if isinstance(ciphertext,CiphertextProfile):
+            codes = ciphertext.get_codes()
+        else:
+            codes = utilities.get_letter_codes(ciphertext)
+        n = len(codes)
+        ranking = []
+        for k in range(1,max_length+1):
+            l = (n // k - 1)*k
+            if l < 1:
+                continue
+            x = int.from_bytes(codes[:l],'big') ^ int.from_bytes(codes[k:k+l],'big')
+            ranking.append([k,utilities.bit_count(x) / l])
+        ranking.sort(key=lambda item: item[1])
+        return ranking
+
+    @staticmethod
+    def crib_drag(ciphertext,crib,max_period=0,top=10):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   ciphertext (str or CiphertextProfile)
+                      crib (str): probable plaintext word (at least 2 letters)
+                      max_period (int): largest key length to look for
+                          default = 0 (half the crib length)
+                      top (int): number of offsets to return, default = 10
+        Return:       offsets (list): [[offset,fragment,period,score],...]
+        Description:  Known plaintext attack on Vigenere Cipher
+                      Slides the crib over every offset of the ciphertext letters
+                      and computes the implied key fragment (ciphertext - crib)
+                      A fragment is periodic with period d if
+                          fragment[i] == fragment[i+d]
+                      score is the fraction of positions where this holds
+                          for the best period
+                      offset counts letters only (non-alpha characters removed)
+                      Sorted by score (highest first), then period, then offset
+                      Uses NumPy sliding windows with the numpy backend
+        Asserts:      crib has at least 2 letters
+        ----------------------------------------------------
+        """
+        if isinstance(ciphertext,CiphertextProfile):
+            codes = ciphertext.get_codes()
+        else:
+            codes = utilities.get_letter_codes(ciphertext)
+        p = utilities.get_letter_codes(crib)
+        m = len(p)
+        assert m > 1, 'invalid crib'
+        if max_period < 1 or max_period > m - 1:
+            max_period = max(m // 2,1)
+        n = len(codes) - m + 1
+        if n < 1:
+            return []
+        alphab = get_chars('lower')
+        if utilities.get_backend().name != 'numpy':
+            result = []
+            for o in range(n):
+                frag = [(codes[o+i] - p[i]) % 26 for i in range(m)]
+                best = [0.0,0]
+                for d in range(1,max_period+1):
+                    x = sum([frag[i] == frag[i+d] for i in range(m-d)]) / (m-d)
+                    if x > best[0]:
+                        best = [x,d]
+                result.append([o,''.join([alphab[x] for x in frag]),best[1],best[0]])
+            result.sort(key=lambda item: (-item[3],item[2],item[0]))
+            return result[:top]
+
+        windows = np.lib.stride_tricks.sliding_window_view(np.frombuffer(codes,dtype=np.uint8),m)
+        frags = (windows.astype(np.int16) - np.frombuffer(p,dtype=np.uint8)) % 26
+        frags = frags.astype(np.uint8)
+        scores = np.zeros(n)
+        periods = np.zeros(n,dtype=np.int64)
+        for d in range(1,max_period+1):
+            x = (frags[:,:m-d] == frags[:,d:]).sum(axis=1) / (m-d)
+            better = x > scores
+            scores[better] = x[better]
+            periods[better] = d
+        k = min(top,n)
+        threshold = np.partition(scores,n-k)[n-k]
+        candidates = np.nonzero(scores >= threshold)[0]
+        order = np.lexsort((candidates,periods[candidates],-scores[candidates]))[:k]
+        result = []
+        for o in candidates[order]:
+            result.append([int(o),''.join([alphab[x] for x in frags[o]]),
+                           int(periods[o]),float(scores[o])])
+        return result
+
+    @staticmethod
+    def ngram_table(text,n=4):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   text (str): training text in the plaintext language
+                      n (int): n-gram size, default = 4
+        Return:       table (list of float): 26**n log10 probabilities
+        Description:  Builds an n-gram fitness table from a training text
+                      An n-gram of letter codes x1..xn is found at index
+                          x1*26**(n-1) + x2*26**(n-2) + ... + xn
+                      n-grams not in text get log10(0.01/total)
+                      Only English letters are considered (case insensitive)
+        Asserts:      n is a positive integer, text has at least n letters
+        ----------------------------------------------------
+        """
+        assert type(n) == int and n > 0, 'invalid n'
+        codes = utilities.get_letter_codes(text)
+        total = len(codes) - n + 1
+        assert total > 0, 'invalid text'
+        counts = [0]*(26**n)
+        idx = 0
+        mask = 26**(n-1)
+        for i in range(len(codes)):
+            idx = (idx % mask)*26 + codes[i]
+            if i >= n - 1:
+                counts[idx] += 1
+        floor = math.log10(0.01/total)
+        return [math.log10(x/total) if x > 0 else floor for x in counts]
+
+    @staticmethod
+    def _fitness_table(table,order):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   table (list, array or LanguageModel)
+                      order (int): n-gram size used from a LanguageModel
+        Return:       table (list or array), n (int): table and its n-gram size
+        Description:  Private helper function
+                      Checks an n-gram fitness table of English letters
+                      A table must hold 26**n values
+                      A LanguageModel gives its table of size order
+        Asserts:      a LanguageModel has base 'lower' and a dense table of size order
+                      table is not a SparseTable, its length is a power of 26
+        ----------------------------------------------------
+        """
+        if isinstance(table,LanguageModel):
+            assert table.get_base() == 'lower', 'language model base should be lower'
+            table = table.get_table(order)
+        assert not isinstance(table,dict), 'sparse tables are not supported'
+        n = round(math.log(max(len(table),1),26))
+        assert n > 0 and len(table) == 26**n, 'invalid table'
+        return table,n
+
+    @staticmethod
+    def trial_decrypt(ciphertext,keys,prefix=1000,table=None,order=4):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   ciphertext (str or CiphertextProfile)
+                      keys (list of str, or 2D numpy array of shifts 0-25)
+                      prefix (int): number of letters decrypted, default = 1000
+                      table (list or LanguageModel): n-gram fitness table
+                          (output of ngram_table or a dense LanguageModel table)
+                          or a LanguageModel of base 'lower'
+                          default = None (chi-squared)
+                      order (int): n-gram size used from a LanguageModel, default = 4
+        Return:       ranking (list): [[key,score],...]
+        Description:  Decrypts the first prefix letters with every key and scores them
+                      Without table: score is the chi-squared value per letter,
+                          sorted lowest first
+                      With table: score is the average n-gram log probability,
+                          sorted highest first
+                      With the numpy backend: all keys are decrypted at once as one
+                          broadcast over a (keys x prefix) matrix
+                      keys are normalized as in Vigenere.set_key,
+                          invalid keys are skipped
+        Asserts:      table is a valid fitness table (see Cryptanalysis._fitness_table)
+        ----------------------------------------------------
+        """
+        n = 1
+        if table is not None:
+            table,n = Cryptanalysis._fitness_table(table,order)
+        alphab = get_chars('lower')
+        if isinstance(ciphertext,CiphertextProfile):
+            c = ciphertext.get_codes()[:prefix]
+        else:
+            c = utilities.get_letter_codes(ciphertext)[:prefix]
+        N = len(c)
+        if np is not None and isinstance(keys,np.ndarray):
+            shifts = [bytes(row) for row in keys.astype(np.uint8) % 26]
+        else:
+            shifts = [utilities.get_letter_codes(k) for k in keys if Vigenere.valid_key(k)]
+        shifts = [k for k in shifts if len(k) > 0]
+        names = [''.join([alphab[x] for x in k]) for k in shifts]
+        if N == 0 or len(shifts) == 0:
+            return [[name,0.0] for name in names]
+
+        if utilities.get_backend().name == 'numpy':
+            K = len(shifts)
+            S = np.empty((K,N),dtype=np.uint8)
+            rows = {}
+            for r in range(K):
+                rows.setdefault(len(shifts[r]),[]).append(r)
+            for L,group in rows.items():
+                block = np.frombuffer(b''.join([shifts[r] for r in group]),dtype=np.uint8)
+                S[group] = np.tile(block.reshape(len(group),L),(1,-(-N // L)))[:,:N]
+            P = (np.frombuffer(c,dtype=np.uint8).astype(np.int16) - S) % 26
+            if table is None:
+                counts = np.bincount((P + np.arange(0,26*K,26)[:,None]).ravel(),
+                                     minlength=26*K).reshape(K,26)
+                expected = np.array(ENGLISH_FREQ)*N
+                scores = (((counts - expected)**2) / expected).sum(axis=1) / N
+            elif N < n:
+                scores = np.zeros(K)
+            else:
+                idx = np.zeros((K,N-n+1),dtype=np.int64)
+                for t in range(n):
+                    idx = idx*26 + P[:,t:N-n+1+t]
+                scores = np.asarray(table)[idx].sum(axis=1) / (N-n+1)
+            scores = scores.tolist()
+        else:
+            scores = []
+            for k in shifts:
+                p = utilities.PythonBackend.shift(c,k,-1)
+                if table is None:
+                    scores.append(Cryptanalysis._chi_squared_counts([p.count(i) for i in range(26)]) / N)
+                elif N < n:
+                    scores.append(0.0)
+                else:
+                    total = 0.0
+                    for w in range(N-n+1):
+                        x = 0
+                        for t in range(n):
+                            x = x*26 + p[w+t]
+                        total += table[x]
+                    scores.append(total / (N-n+1))
+        ranking = [[names[r],scores[r]] for r in range(len(names))]
+        if table is None:
+            ranking.sort(key=lambda item: item[1])
+        else:
+            ranking.sort(key=lambda item: -item[1])
+        return ranking
+
+    @staticmethod
+    def _pick_key_length(ranking,tolerance=0.05):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   ranking (list): [[key_length,score],...] (highest score first)
+                      tolerance (float): default = 0.05
+        Return:       key_length (int)
+        Description:  Private helper function
+                      Multiples of the key length score as high as the key length
+                      Returns the smallest key length whose score is within
+                          tolerance of the best score
+        ----------------------------------------------------
+        """
+        best = ranking[0][1]
+        return min([L for L,score in ranking if score >= best*(1-tolerance)])
+
+    @staticmethod
+    def _column_counts(codes,key_length):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   codes (bytes, memoryview or numpy array): letter codes
+                      key_length (int)
+        Return:       counts (2D list): key_length x 26 letter counts
+        Description:  Private helper function
+                      counts[c] is the histogram of column c,
+                      i.e. of codes c, c + key_length, c + 2*key_length, ...
+                      Uses the column_counts kernel of the selected backend
+                          (NumPy: one bincount over the codes reshaped
+                          to rows of key_length)
+        ----------------------------------------------------
+        """
+        return utilities.get_backend().column_counts(codes,key_length)
+
     @staticmethod
     def cipher_shifting(ciphertext,args =[20,26]):
         """
         ----------------------------------------------------
-        Parameters:   ciphertext (str)
+        Parameters:   ciphertext (str or CiphertextProfile)
                       args (lsit):
                           max_key_length (int): default = 20
                           factor (int): default = 26
@@ -136,17 +668,17 @@ class Cryptanalysis:
         Asserts:      ciphertext is a non-empty string
         ----------------------------------------------------
         """
-        un = get_chars('nonalpha') + ' ' + '\n' +'\t'
-        ciphertext = utilities.clean_text(ciphertext,un)
-        shift =  ciphertext
+        if not isinstance(ciphertext,CiphertextProfile):
+            ciphertext = CiphertextProfile(ciphertext)
+        # same as compare_texts(ciphertext, ' '*i + ciphertext[:-i]) for every shift i
+        coincidences = ciphertext.get_coincidences(args[1]-1)
         mostMatches = 0
         max1 = 0
         mostMatchess = 0
         max2 = 0
 
         for i in range(1,args[1]):
-            shift = ' ' + shift[:-1]
-            n = compare_texts(ciphertext, shift)
+            n = coincidences[i-1]
             if i > args[0]:
                 x = i % args[0]
             else:
@@ -161,6 +693,177 @@ class Cryptanalysis:
                 mostMatchess = n
                 max2 = x
         return [max1,max2]
+class CiphertextProfile:
+    """
+    ----------------------------------------------------
+    Description: Ciphertext and its statistics, computed once
+                 Every view (clean text, histogram, IOC, columns,
+                     coincidences) is computed on first access and cached
+                 Can be passed instead of the ciphertext to
+                     Cryptanalysis.index_of_coincidence, friedman, chi_squared,
+                     cipher_shifting, rank_key_lengths, hamming_key_length,
+                     crib_drag, trial_decrypt, Shift.cryptanalyze,
+                     Vigenere.cryptanalyze_key_length, Vigenere.cryptanalyze,
+                     Vigenere.cryptanalyze_parallel, Vigenere.hill_climb,
+                     Vigenere.cryptanalyze_running_key and RunningKeyIndex.search
+                     with the same results
+    ----------------------------------------------------
+    """
+
+    NONALPHA = get_chars('nonalpha') + ' ' + '\n' + '\t'
+    WHITESPACE = ' ' + '\n' + '\t'
+
+    def __init__(self,text):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str): ciphertext
+        Description:  CiphertextProfile constructor
+        Asserts:      text is a string
+        ---------------------------------------------------
+        """
+        assert type(text) == str, 'invalid text'
+        self._text = text
+        self._clean = {}
+        self._positions = {}
+        self._histogram = None
+        self._ioc = None
+        self._chi = None
+        self._codes = None
+        self._columns = {}
+        self._column_counts = {}
+        self._coincidences = {}
+
+    def get_text(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       text (str): the ciphertext, unchanged
+        ---------------------------------------------------
+        """
+        return self._text
+
+    def get_clean(self,characters=NONALPHA):
+        """
+        ----------------------------------------------------
+        Parameters:   characters (str): characters to remove,
+                          default = non alpha characters and white spaces
+        Return:       text (str): clean_text(text,characters)
+        ---------------------------------------------------
+        """
+        if characters not in self._clean:
+            self._clean[characters] = clean_text(self._text,characters)
+        return self._clean[characters]
+
+    def get_positions(self,characters=WHITESPACE):
+        """
+        ----------------------------------------------------
+        Parameters:   characters (str): default = white spaces
+        Return:       positions (list): get_positions(text,characters)
+        ---------------------------------------------------
+        """
+        if characters not in self._positions:
+            self._positions[characters] = get_positions(self._text,characters)
+        return self._positions[characters]
+
+    def get_length(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       length (int): length of the clean text
+        ---------------------------------------------------
+        """
+        return len(self.get_clean())
+
+    def get_histogram(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       counts (list): 26 letter counts (a to z, case insensitive)
+        ---------------------------------------------------
+        """
+        if self._histogram is None:
+            text = self.get_clean().lower()
+            self._histogram = [text.count(chr(97+i)) for i in range(26)]
+        return self._histogram
+
+    def get_ioc(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       I (float): Cryptanalysis.index_of_coincidence(text)
+        ---------------------------------------------------
+        """
+        if self._ioc is None:
+            seq = 0.0
+            if len(self._text) > 0:
+                l = len(self.get_clean().lower())
+                rrr = (l*l-l)
+                for x in self.get_histogram():
+                    seq += (x*(x-1))/rrr
+            self._ioc = seq
+        return self._ioc
+
+    def get_chi_squared(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       result (float): Cryptanalysis.chi_squared(text)
+        ---------------------------------------------------
+        """
+        if self._chi is None:
+            self._chi = Cryptanalysis.chi_squared(self._text)
+        return self._chi
+
+    def get_codes(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       codes (bytes): utilities.get_letter_codes(text)
+        ---------------------------------------------------
+        """
+        if self._codes is None:
+            self._codes = utilities.get_letter_codes(self._text)
+        return self._codes
+
+    def get_columns(self,key_length):
+        """
+        ----------------------------------------------------
+        Parameters:   key_length (int)
+        Return:       columns (list of bytes): letter codes of every key position
+        ---------------------------------------------------
+        """
+        if key_length not in self._columns:
+            self._columns[key_length] = utilities.get_backend().split_columns(self.get_codes(),key_length)
+        return self._columns[key_length]
+
+    def get_column_counts(self,key_length):
+        """
+        ----------------------------------------------------
+        Parameters:   key_length (int)
+        Return:       counts (list): 26 letter counts of every column
+        ---------------------------------------------------
+        """
+        if key_length not in self._column_counts:
+            self._column_counts[key_length] = Cryptanalysis._column_counts(self.get_codes(),key_length)
+        return self._column_counts[key_length]
+
+    def get_coincidences(self,max_shift):
+        """
+        ----------------------------------------------------
+        Parameters:   max_shift (int)
+        Return:       counts (list): coincidences of the clean text
+                          with itself shifted by 1..max_shift
+        Description:  As counted by Cryptanalysis.cipher_shifting
+                          (upper and lower case characters are different)
+        ---------------------------------------------------
+        """
+        backend = utilities.get_backend()
+        text = self.get_clean()
+        for i in range(1,max_shift+1):
+            if i not in self._coincidences:
+                self._coincidences[i] = backend.coincidences(text,i)
+        return [self._coincidences[i] for i in range(1,max_shift+1)]
+
 class Shift:
     """
     ----------------------------------------------------
@@ -173,6 +876,10 @@ class Shift:
                  Case sensitive
                  Preserves the case whenever possible
                  Uses circular left shift
+                 Encryption and decryption tables are compiled with the key
+                     and stored with it as one (key,encrypt,decrypt) tuple,
+                     replaced as a whole by set_key, so a Shift object can be
+                     shared by threads without locks
     ----------------------------------------------------
     """
     BASE = utilities.get_chars('pascii')
@@ -185,13 +892,13 @@ class Shift:
                         #shifts, start_index, end_indx 
                         (inclusive both ends of indices)
         Description:  Shift constructor
-                      sets _key
+                      sets _state: key and compiled tables
         ---------------------------------------------------
         """
         if self.valid_key(key):
-            self._key = key
+            self._state = self._compile(key)
         else:
-            self._key = self.DEFAULT_KEY
+            self._state = self._compile(self.DEFAULT_KEY)
             #maybe we just take one of tuple to default
 
 
@@ -204,7 +911,7 @@ class Shift:
         Description:  Returns a copy of the Shift key
         ---------------------------------------------------
         """
-        return self._key
+        return self._state[0]
 
     def set_key(self,key):
         """
@@ -217,12 +924,12 @@ class Shift:
         ---------------------------------------------------
         """
         if self.valid_key(key):
-            self._key = key
             if key[0] < 0:
-                self._key = (key[2]-key[1]+key[0]+1, key[1], key[2])
+                key = (key[2]-key[1]+key[0]+1, key[1], key[2])
+            self._state = self._compile(key)
             return True
         else:
-            self._key = self.DEFAULT_KEY
+            self._state = self._compile(self.DEFAULT_KEY)
         return False
 
     def get_base(self):
@@ -236,7 +943,8 @@ class Shift:
                       (inclusive both ends)
         ---------------------------------------------------
         """
-        return self.BASE[self._key[1]:self._key[2]+1]
+        key = self._state[0]
+        return self.BASE[key[1]:key[2]+1]
 
     def __str__(self):
         """
@@ -252,13 +960,10 @@ class Shift:
                       sub  = <sub>
         ---------------------------------------------------
         """
-        sub = ''
-        i = 0
-        l = len(self.get_base())
-        while i < l:
-            sub += self.get_base()[(self._key[0]+i)%l]
-            i+=1
-        return 'Shift Cipher:\nkey = {}\nbase = {}\nsub  = {}'.format(self._key,self.get_base(),sub)
+        key,enc,_ = self._state
+        base = self.BASE[key[1]:key[2]+1]
+        sub = base.translate(enc)
+        return 'Shift Cipher:\nkey = {}\nbase = {}\nsub  = {}'.format(key,base,sub)
     
     @staticmethod
     def valid_key(key):
@@ -292,20 +997,7 @@ class Shift:
         Asserts:      plaintext is a string
         ---------------------------------------------------
         """
-        sub = ''
-        i = 0
-        l = len(self.get_base())
-        while i < l:
-            sub += self.get_base()[(self._key[0] + i) % l]
-            i += 1
-        ciphertext = ''
-        for j in range(len(plaintext)):
-            if self.get_base().find(plaintext[j]) == -1:
-                ciphertext += plaintext[j]
-                continue
-            ciphertext += sub[self.get_base().index(plaintext[j])]
-
-        return ciphertext
+        return plaintext.translate(self._state[1])
 
     def decrypt(self,ciphertext):
         """
@@ -313,20 +1005,37 @@ class Shift:
         Parameters:   ciphertext (str)
         Return:       plaintext (str)
         Description:  Decryption using Shift Cipher
+                      Uses the decryption table, the key is not changed
         Asserts:      ciphertext is a string
         ---------------------------------------------------
         """
-        self._key = (self._key[2]-self._key[1]-self._key[0]+1, self._key[1], self._key[2])
-        plaintext = self.encrypt(ciphertext)
-        self._key = (self._key[2]-self._key[1]-self._key[0]+1, self._key[1], self._key[2])
-        return plaintext
+        return ciphertext.translate(self._state[2])
+
+    @staticmethod
+    def _compile(key):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   key (int,int,int): valid Shift key
+        Return:       state (tuple): key, encryption table, decryption table
+        Description:  Private helper function
+                      Builds the str.translate tables of the key:
+                          base is substituted by base shifted key[0] times
+                          (decryption: shifted len(base) - key[0] times)
+        ---------------------------------------------------
+        """
+        base = Shift.BASE[key[1]:key[2]+1]
+        l = len(base)
+        enc = ''.join([base[(key[0] + i) % l] for i in range(l)])
+        dec = ''.join([base[(l - key[0] + i) % l] for i in range(l)])
+        return key,str.maketrans(base,enc),str.maketrans(base,dec)
 
     @staticmethod
     def cryptanalyze(ciphertext,args=['',-1,-1]):
         """
         ----------------------------------------------------
         Static method
-        Parameters:   ciphertext (string)
+        Parameters:   ciphertext (string or CiphertextProfile)
                       args (list):
                             base: (str): default = ''
                             shifts: (int): default = -1
@@ -339,9 +1048,12 @@ class Shift:
         ---------------------------------------------------
         """
         un = ' ' + '\n' + '\t'
-        position = get_positions(ciphertext,un)
-        ciphertext = clean_text(ciphertext,un)
-        tst = Shift()
+        if isinstance(ciphertext,CiphertextProfile):
+            profile = ciphertext
+        else:
+            profile = CiphertextProfile(ciphertext)
+        position = profile.get_positions(un)
+        ciphertext = profile.get_clean(un)
         st = 0
         ed = 0
         plain = ''
@@ -353,8 +1065,7 @@ class Shift:
             st = Shift.BASE.index(args[0][0])
             ed = Shift.BASE.index(args[0][len(args[0])-1])
             key = (args[1],st,ed)
-            tst.set_key(key)
-            plain = tst.decrypt(ciphertext)
+            plain = Shift(key).decrypt(ciphertext)
             return key,insert_positions(plain,position)
         # base
         elif args[0] != '':
@@ -363,8 +1074,7 @@ class Shift:
             minichi = Cryptanalysis.chi_squared(ciphertext)
             for i in range(1,ed-st-1):
                 key = (i,st,ed)
-                tst.set_key(key)
-                plain = tst.decrypt(ciphertext)
+                plain = Shift(key).decrypt(ciphertext)
                 x = Cryptanalysis.chi_squared(plain)
                 if  x < minichi:
                     minichi = x
@@ -377,8 +1087,7 @@ class Shift:
             minichi = Cryptanalysis.chi_squared(ciphertext)
             for i in range(len(Shift.BASE)):
                 key = (args[1], 0+i, args[2]+i-1)
-                tst.set_key(key)
-                plain = tst.decrypt(ciphertext)
+                plain = Shift(key).decrypt(ciphertext)
                 x = Cryptanalysis.chi_squared(plain)
                 if x < minichi:
                     minichi = x
@@ -391,8 +1100,7 @@ class Shift:
             for i in range(len(Shift.BASE)):
                 for j in range(1,args[2]-1):
                     key = (j,0+i,args[2]+i-1)
-                    tst.set_key(key)
-                    plain = tst.decrypt(ciphertext)
+                    plain = Shift(key).decrypt(ciphertext)
                     x = Cryptanalysis.chi_squared(plain)
                     if x < minichi:
                         ret_plain = plain
@@ -415,6 +1123,9 @@ class Vigenere:
                  In running key: repeat the key
                  Substitutes only alpha characters (both upper and lower)
                  Preserves the case of characters
+                 The key is stored with its compiled running key tables
+                     as one (key,encrypt,decrypt) tuple, replaced as a whole
+                     by set_key, so a Vigenere object can be shared by threads
     ----------------------------------------------------
     """
     
@@ -425,14 +1136,14 @@ class Vigenere:
         ----------------------------------------------------
         Parameters:   _key (str): default value: 'k'
         Description:  Vigenere constructor
-                      sets _key
+                      sets _state: key and compiled tables
                       if invalid key, set to default key
         ---------------------------------------------------
         """
         if self.valid_key(key):
             self.set_key(key)
         else:
-            self._key = self.DEFAULT_KEY
+            self._state = self._compile(self.DEFAULT_KEY)
     
     def get_key(self):
         """
@@ -442,8 +1153,7 @@ class Vigenere:
         Description:  Returns a copy of the Vigenere key
         ---------------------------------------------------
         """
-        # your code here
-        return self._key
+        return self._state[0]
        
     def set_key(self,key):
         """
@@ -458,7 +1168,7 @@ class Vigenere:
         """ 
         if self.valid_key(key):
             if key.isalpha() and key.islower():
-                self._key = key
+                k = key
             else:
                 k = ''
                 for i in range(len(key)):
@@ -468,11 +1178,34 @@ class Vigenere:
                         k += key[i].lower()
                     else:
                         continue
-                self._key=k
+            self._state = self._compile(k)
             return True
         else:
-            self._key = self.DEFAULT_KEY
+            self._state = self._compile(self.DEFAULT_KEY)
             return False
+
+    @staticmethod
+    def _compile(key):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   key (str): lower case key
+        Return:       state (tuple): key, encryption tables, decryption tables
+        Description:  Private helper function
+                      One case preserving {letter: substitute} table
+                          per key character, for the running key method
+                      A key character that is not an English letter gets
+                          an empty table (the running key method fails on it)
+        ---------------------------------------------------
+        """
+        index_map = get_index_map(get_chars('lower'))
+        enc = []
+        dec = []
+        for c in key:
+            s = index_map.get(ord(c))
+            enc.append({} if s is None else utilities.get_shift_tables('e')[s])
+            dec.append({} if s is None else utilities.get_shift_tables('d')[s])
+        return key,enc,dec
     
     def __str__(self):
         """
@@ -544,16 +1277,18 @@ class Vigenere:
         ---------------------------------------------------
         """
         assert type(plaintext) == str, 'invalid plaintext'
-        
-        if len(self._key) == 1:
-            return self._encrypt_auto(plaintext)
+        # one read of the state: a concurrent set_key cannot mix two keys
+        state = self._state
+        if len(state[0]) == 1:
+            return self._encrypt_auto(plaintext,state)
         else:
-            return self._encrypt_run(plaintext)
+            return self._encrypt_run(plaintext,state)
 
-    def _encrypt_auto(self,plaintext):
+    def _encrypt_auto(self,plaintext,state):
         """
         ----------------------------------------------------
         Parameters:   plaintext (str)
+                      state (tuple): key and tables, read once by encrypt
         Return:       ciphertext (str)
         Description:  Private helper function
                       Encryption using Vigenere Cipher Using an autokey
@@ -564,43 +1299,27 @@ class Vigenere:
         plaintext = clean_text(plaintext,un)
         ciphertext = ''
         base = get_chars('lower')
+        key = state[0]
         for i in range(len(plaintext)-1):
             if plaintext[i].isupper():
-                ciphertext += base[(base.index(plaintext[i].lower()) + base.index(self._key)) % len(base)].upper()
+                ciphertext += base[(base.index(plaintext[i].lower()) + base.index(key)) % len(base)].upper()
             else:
-                ciphertext+=base[(base.index(plaintext[i]) + base.index(self._key)) % len(base)]
+                ciphertext+=base[(base.index(plaintext[i]) + base.index(key)) % len(base)]
         ciphertext = insert_positions(ciphertext,position)
         return ciphertext
 
-    def _encrypt_run(self, plaintext):
+    def _encrypt_run(self, plaintext, state, offset=0):
         """
         ----------------------------------------------------
         Parameters:   plaintext (str)
+                      state (tuple): key and tables, read once by encrypt
+                      offset (int): key position of first alpha char, default = 0
         Return:       ciphertext (str)
         Description:  Private helper function
                       Encryption using Vigenere Cipher Using a running key
         ---------------------------------------------------
         """
-        alphab = get_chars('lower')
-        k = self._key
-        k_l = len(k)
-        ciphertext = ''
-        j = 0
-        for i in range(len(plaintext)):
-            if plaintext[i].isalpha():
-                cindex = alphab.index(plaintext[i].lower())
-                kk = k[j%k_l]
-                j+=1
-                key_s = alphab.index(kk)
-                encrypt = (cindex + key_s) % 26
-                encryptc = alphab[encrypt]
-                if plaintext[i].isupper():
-                    ciphertext += encryptc.upper()
-                else:
-                    ciphertext += encryptc
-            else:
-                ciphertext += plaintext[i]
-        return ciphertext
+        return Vigenere._substitute(plaintext,state[1],offset)
     def decrypt(self,ciphertext):
         """
         ----------------------------------------------------
@@ -612,16 +1331,18 @@ class Vigenere:
         ---------------------------------------------------
         """
         assert type(ciphertext) == str, 'invalid input'
-        
-        if len(self._key) == 1:
-            return self._decryption_auto(ciphertext)
+        # one read of the state: a concurrent set_key cannot mix two keys
+        state = self._state
+        if len(state[0]) == 1:
+            return self._decryption_auto(ciphertext,state)
         else:
-            return self._decryption_run(ciphertext)
+            return self._decryption_run(ciphertext,state)
 
-    def _decryption_auto(self,ciphertext):
+    def _decryption_auto(self,ciphertext,state):
         """
         ----------------------------------------------------
         Parameters:   ciphertext (str)
+                      state (tuple): key and tables, read once by decrypt
         Return:       plaintext (str)
         Description:  Private Helper method
                       Decryption using Vigenere Cipher Using autokey
@@ -632,73 +1353,2766 @@ class Vigenere:
         ciphertext = clean_text(ciphertext, un)
         plaintext = ''
         base = get_chars('lower')
+        key = state[0]
         for i in range(len(plaintext) - 1):
             if ciphertext[i].isupper():
-                plaintext += base[(base.index(ciphertext[i].lower()) - base.index(self._key)) % len(base)].upper()
+                plaintext += base[(base.index(ciphertext[i].lower()) - base.index(key)) % len(base)].upper()
             else:
-                plaintext += base[(base.index(ciphertext[i]) - base.index(self._key)) % len(base)]
+                plaintext += base[(base.index(ciphertext[i]) - base.index(key)) % len(base)]
         plaintext = insert_positions(plaintext, position)
         return plaintext
 
-    def _decryption_run(self,ciphertext):
+    def _decryption_run(self,ciphertext,state,offset=0):
         """
         ----------------------------------------------------
         Parameters:   ciphertext (str)
+                      state (tuple): key and tables, read once by decrypt
+                      offset (int): key position of first alpha char, default = 0
         Return:       plaintext (str)
         Description:  Private Helper method
                       Decryption using Vigenere Cipher Using running key
         ---------------------------------------------------
         """
-        alphab = get_chars('lower')
-        k = self._key
-        k_l = len(k)
-        plain = ''
-        j = 0
-        for i in range(len(ciphertext)):
-            if ciphertext[i].isalpha():
-                cindex = alphab.index(ciphertext[i].lower())
-                kk = k[j % k_l]
-                j += 1
-                key_s = alphab.index(kk)
-                encrypt = (cindex - key_s) % 26
-                encryptc = alphab[encrypt]
-                if ciphertext[i].isupper():
-                    plain += encryptc.upper()
-                else:
-                    plain += encryptc
-            else:
-                plain += ciphertext[i]
-        return plain
+        return Vigenere._substitute(ciphertext,state[2],offset)
+
     @staticmethod
-    def cryptanalyze_key_length(ciphertext):
+    def _substitute(text,tables,offset=0):
         """
         ----------------------------------------------------
         Static Method
-        Parameters:   ciphertext (str)
-        Return:       key_lenghts (list)
-        Description:  Finds key length for Vigenere Cipher
-                      Combines results of Friedman and Cipher Shifting
-                      Produces a list of key lengths from the above two functions
-                      Start with Friedman and removes duplicates
+        Parameters:   text (str)
+                      tables (list): one {letter: substitute} table per key position
+                      offset (int): key position of first alpha char, default = 0
+        Return:       result (str)
+        Description:  Private helper function
+                      Substitutes every alpha character with the current table
+                      and moves to the next table, other characters are kept
+        Errors:       ValueError if text (or the key) has a non English letter
         ---------------------------------------------------
         """
-        #your code here
-        return []
-
-    @staticmethod
-    def cryptanalyze(ciphertext):
+        result = []
+        k_l = len(tables)
+        j = offset % k_l
+        for c in text:
+            s = tables[j].get(c)
+            if s is not None:
+                result.append(s)
+                j += 1
+                if j == k_l:
+                    j = 0
+            elif c.isalpha():
+                raise ValueError('invalid character {}'.format(c))
+            else:
+                result.append(c)
+        return ''.join(result)
+    def encrypt_stream(self,chunks):
+        """
+        ----------------------------------------------------
+        Parameters:   chunks (iterable of str)
+        Return:       generator of ciphertext chunks (str)
+        Description:  Encrypts a text given in chunks, one chunk at a time
+                      The key position is carried from one chunk to the next,
+                          so the output is the same as encrypting the whole text
+                      Always uses the running key method
+        ---------------------------------------------------
+        """
+        _,tables,_ = self._state
+        offset = 0
+        for chunk in chunks:
+            yield Vigenere._substitute(chunk,tables,offset)
+            offset = (offset + sum(map(str.isalpha,chunk))) % len(tables)
+
+    def decrypt_stream(self,chunks):
+        """
+        ----------------------------------------------------
+        Parameters:   chunks (iterable of str)
+        Return:       generator of plaintext chunks (str)
+        Description:  Decrypts a text given in chunks, one chunk at a time
+                      The key position is carried from one chunk to the next
+                      Always uses the running key method
+        ---------------------------------------------------
+        """
+        _,_,tables = self._state
+        offset = 0
+        for chunk in chunks:
+            yield Vigenere._substitute(chunk,tables,offset)
+            offset = (offset + sum(map(str.isalpha,chunk))) % len(tables)
+
+    def decrypt_range(self,filename,start,end,index=None):
+        """
+        ----------------------------------------------------
+        Parameters:   filename (str): file encrypted with this key
+                      start (int): first byte offset
+                      end (int): byte offset after the last byte
+                      index (KeyPhaseIndex): default = None
+                          (loaded from the sidecar file, built if missing)
+        Return:       plaintext (str)
+        Description:  Decrypts bytes start..end-1 of an encrypted file
+                      The key position is found from the nearest checkpoint,
+                          so only the slice (and at most one index interval
+                          before it) is read
+                      Uses the running key method
+                      Bytes are decoded as UTF-8, a character cut by start or end
+                          is replaced
+        Asserts:      0 <= start <= end
+        ---------------------------------------------------
+        """
+        assert type(start) == int and type(end) == int and 0 <= start <= end, 'invalid range'
+        if index is None:
+            index = KeyPhaseIndex.load(filename)
+            if index is None:
+                index = KeyPhaseIndex.build(filename)
+        checkpoint,letters = index.locate(start)
+        with open(filename,'rb') as infile:
+            infile.seek(checkpoint)
+            letters += len(utilities.get_letter_codes(infile.read(start - checkpoint)))
+            data = infile.read(end - start)
+        shifts = utilities.get_letter_codes(self._state[0])
+        tables = utilities.get_shift_tables('d','bytes')
+        k_l = len(shifts)
+        j = letters % k_l
+        plain = bytearray(data)
+        for i in range(len(plain)):
+            b = plain[i]
+            if 65 <= b <= 90 or 97 <= b <= 122:
+                plain[i] = tables[shifts[j]][b]
+                j += 1
+                if j == k_l:
+                    j = 0
+        return plain.decode('utf-8','replace')
+
+    @staticmethod
+    def cryptanalyze_key_length(ciphertext):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   ciphertext (str or CiphertextProfile)
+        Return:       key_lenghts (list)
+        Description:  Finds key length for Vigenere Cipher
+                      Combines results of Friedman and Cipher Shifting
+                      Produces a list of key lengths from the above two functions
+                      Start with Friedman and removes duplicates
+                      Both functions share one CiphertextProfile
+        ---------------------------------------------------
+        """
+        if not isinstance(ciphertext,CiphertextProfile):
+            ciphertext = CiphertextProfile(ciphertext)
+        key_lengths = []
+        for k in Cryptanalysis.friedman(ciphertext) + Cryptanalysis.cipher_shifting(ciphertext):
+            if k not in key_lengths:
+                key_lengths.append(k)
+        return key_lengths
+
+    @staticmethod
+    def cryptanalyze(ciphertext):
         """
         ----------------------------------------------------
         Static method
-        Parameters:   ciphertext (string)
+        Parameters:   ciphertext (string or CiphertextProfile)
         Return:       key,plaintext
-        Description:  Cryptanalysis of Shift Cipher
-                      Returns plaintext and key (shift,start_indx,end_indx)
+        Description:  Cryptanalysis of Vigenere Cipher
+                      Returns plaintext and key (str)
+                      The text is cleaned and counted once (CiphertextProfile)
                       Uses the key lengths produced by Vigenere.cryptanalyze_key_length
                       Finds out the key, then apply chi_squared
                       The key with the lowest chi_squared value is returned
+                          if equal, the key found first is returned
+                      A multiple of the key length scores as low as the key
+                          length, the key is shortened to its smallest period
+                      A key of one character is applied as a running key
+                      returns '','' if ciphertext has less than two letters
+        Asserts:      ciphertext is a non-empty string
+        ---------------------------------------------------
+        """
+        if isinstance(ciphertext,CiphertextProfile):
+            profile = ciphertext
+        else:
+            assert type(ciphertext) == str, 'invalid input'
+            profile = CiphertextProfile(ciphertext)
+        assert profile.get_text() != '', 'invalid input'
+        if len(profile.get_codes()) < 2:
+            return '',''
+        best = None
+        for k in Vigenere.cryptanalyze_key_length(profile):
+            result = Vigenere._score_key_length(profile,k)
+            if result is not None and (best is None or result[1] < best[1]):
+                best = result
+        if best is None:
+            return '',''
+        key = Vigenere._smallest_period(best[2])
+        return key,Vigenere._decrypt_with(key,profile.get_text())
+
+    @staticmethod
+    def cryptanalyze_running_key(ciphertext,corpus):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   ciphertext (string or CiphertextProfile)
+                      corpus (str or RunningKeyIndex): text the key was taken from
+        Return:       key,plaintext
+        Description:  Cryptanalysis of Vigenere Cipher with a running key
+                      taken from a passage of corpus
+                      Uses RunningKeyIndex.search, returns the passage with
+                      the lowest chi-squared value
+                      returns '','' if no passage is found
+        Asserts:      ciphertext is a non-empty string
+        ---------------------------------------------------
+        """
+        if isinstance(ciphertext,CiphertextProfile):
+            profile = ciphertext
+        else:
+            assert type(ciphertext) == str, 'invalid input'
+            profile = CiphertextProfile(ciphertext)
+        assert profile.get_text() != '', 'invalid input'
+        if type(corpus) == str:
+            corpus = RunningKeyIndex(corpus)
+        results = corpus.search(profile,top=1)
+        if len(results) == 0:
+            return '',''
+        key = corpus.get_key(results[0][0],len(profile.get_codes()))
+        return key,Vigenere._decrypt_with(key,profile.get_text())
+
+    @staticmethod
+    def hill_climb(ciphertext,key_length,table=None,iterations=5000,restarts=3,
+                   temperature=0.0,seed=0,order=4):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   ciphertext (string or CiphertextProfile)
+                      key_length (int)
+                      table (list or LanguageModel): n-gram fitness table
+                          (output of Cryptanalysis.ngram_table or a dense
+                          LanguageModel table) or a LanguageModel of base 'lower'
+                          default = None (unigram table from ENGLISH_FREQ)
+                      iterations (int): key changes tried per restart, default = 5000
+                      restarts (int): default = 3
+                      temperature (float): simulated annealing start temperature
+                          default = 0.0 (hill climbing)
+                      seed (int): default = 0
+                      order (int): n-gram size used from a LanguageModel, default = 4
+        Return:       key,plaintext
+        Description:  Cryptanalysis of Vigenere Cipher for a known key length
+                      Useful when columns are too short for chi-squared
+                      Each iteration changes one key character
+                          the change is kept if the fitness improves
+                          (or, when annealing, with probability exp(delta/T))
+                      Only the n-grams that contain a letter of the changed
+                          column are rescored (delta fitness), the text is
+                          never decrypted again
+                      First restart starts from the chi-squared key,
+                          the others from random keys
+        Asserts:      ciphertext has at least key_length letters
+                      table is a valid fitness table (see Cryptanalysis._fitness_table)
+        ---------------------------------------------------
+        """
+        if isinstance(ciphertext,CiphertextProfile):
+            profile = ciphertext
+        else:
+            profile = CiphertextProfile(ciphertext)
+        c = profile.get_codes()
+        N = len(c)
+        k = key_length
+        assert type(k) == int and 0 < k <= N, 'invalid key_length'
+        if table is None:
+            table = [math.log10(f) for f in ENGLISH_FREQ]
+        table,n = Cryptanalysis._fitness_table(table,order)
+        if n > N:
+            n = 1
+            table = [math.log10(f) for f in ENGLISH_FREQ]
+        mult = [26**(n-1-t) for t in range(n)]
+        last = N - n
+        # for every column: positions, and windows containing one of them
+        positions = [list(range(j,N,k)) for j in range(k)]
+        windows = []
+        for j in range(k):
+            w = set()
+            for i in positions[j]:
+                for t in range(n):
+                    if 0 <= i - t <= last:
+                        w.add(i - t)
+            windows.append(sorted(w))
+
+        rng = random.Random(seed)
+        start = Vigenere._score_key_length(profile,k)[2]
+        alphab = get_chars('lower')
+        best_key = None
+        best_score = None
+        for r in range(restarts):
+            if r == 0:
+                key = [alphab.index(x) for x in start]
+            else:
+                key = [rng.randrange(26) for _ in range(k)]
+            p = list(utilities.get_backend().shift(c,bytes(key),-1))
+            idx = [0]*(last+1)
+            for w in range(last+1):
+                x = 0
+                for t in range(n):
+                    x = x*26 + p[w+t]
+                idx[w] = x
+            score = sum([table[x] for x in idx])
+            T = temperature
+            for it in range(iterations):
+                j = rng.randrange(k)
+                s = (key[j] + rng.randrange(1,26)) % 26
+                cols = windows[j]
+                old = 0.0
+                for w in cols:
+                    old += table[idx[w]]
+                d_shift = key[j] - s
+                for i in positions[j]:
+                    q = (p[i] + d_shift) % 26
+                    d = q - p[i]
+                    p[i] = q
+                    for t in range(n):
+                        w = i - t
+                        if 0 <= w <= last:
+                            idx[w] += d*mult[t]
+                new = 0.0
+                for w in cols:
+                    new += table[idx[w]]
+                delta = new - old
+                if delta >= 0 or (T > 0 and rng.random() < math.exp(delta/T)):
+                    key[j] = s
+                    score += delta
+                else:
+                    for i in positions[j]:
+                        q = (p[i] - d_shift) % 26
+                        d = q - p[i]
+                        p[i] = q
+                        for t in range(n):
+                            w = i - t
+                            if 0 <= w <= last:
+                                idx[w] += d*mult[t]
+                if T > 0:
+                    T = temperature*(1 - (it + 1)/iterations)
+            if best_score is None or score > best_score:
+                best_score = score
+                best_key = ''.join([alphab[x] for x in key])
+        return best_key,Vigenere._decrypt_with(best_key,profile.get_text())
+
+    @staticmethod
+    def cryptanalyze_parallel(ciphertext,key_lengths=None,processes=None,threshold=0.1):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   ciphertext (string or CiphertextProfile)
+                      key_lengths (list): default = None
+                          (Vigenere.cryptanalyze_key_length is used)
+                      processes (int): number of worker processes
+                          default = None (one per core)
+                      threshold (float): default = 0.1
+        Return:       key,plaintext
+        Description:  Same as Vigenere.cryptanalyze, but every candidate key length
+                      is analyzed in a separate worker process
+                      The ciphertext letters are shared with the workers
+                          through SharedCiphertext (no pickling)
+                      Fitness is the chi-squared value per plaintext letter
+                          (long English texts score about 0.02 to 0.05,
+                          about 25/letters more for short texts;
+                          a divisor of the key length scores 0.3 or more)
+                      Results are read as the workers finish them:
+                          at the first one with a fitness below threshold,
+                          candidates not started yet are cancelled and the
+                          function returns without waiting for running ones
+                          (they finish in the background)
+                      The key with the lowest fitness among the results read
+                          is returned (if equal, the shortest key length),
+                          shortened to its smallest period
+                      When several candidates are below threshold, which one
+                          is read first depends on the workers' timing
         Asserts:      ciphertext is a non-empty string
         ---------------------------------------------------
         """
-        #your code here
-        return '',''
+        if isinstance(ciphertext,CiphertextProfile):
+            profile = ciphertext
+        else:
+            assert type(ciphertext) == str, 'invalid input'
+            profile = CiphertextProfile(ciphertext)
+        ciphertext = profile.get_text()
+        assert ciphertext != '', 'invalid input'
+        if len(profile.get_codes()) < 2:
+            return '',''
+        if key_lengths is None:
+            key_lengths = Vigenere.cryptanalyze_key_length(profile)
+        key_lengths = [k for k in key_lengths if type(k) == int and k > 0]
+        if len(key_lengths) == 0:
+            return '',''
+        shared = SharedCiphertext(ciphertext)
+        n = shared.get_size()
+        if n == 0:
+            shared.close()
+            return '',''
+        best = None
+        executor = ProcessPoolExecutor(max_workers=processes)
+        try:
+            futures = [executor.submit(SharedCiphertext._run,shared.get_name(),n,
+                                       Vigenere._score_key_length,k) for k in key_lengths]
+            for future in as_completed(futures):
+                result = future.result()
+                if result is None:
+                    continue
+                if best is None or result[1] < best[1] or \
+                        (result[1] == best[1] and result[0] < best[0]):
+                    best = result
+                if result[1] / n < threshold:
+                    break
+        finally:
+            # running workers keep their own mapping of the shared memory
+            executor.shutdown(wait=False,cancel_futures=True)
+            shared.close()
+        if best is None:
+            return '',''
+        key = Vigenere._smallest_period(best[2])
+        return key,Vigenere._decrypt_with(key,ciphertext)
+
+    @staticmethod
+    def _score_key_length(codes,key_length):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   codes (bytes, memoryview or numpy array): letter codes
+                          or a CiphertextProfile (its column counts are reused)
+                      key_length (int)
+        Return:       [key_length,chi,key] or None
+        Description:  Private helper function
+                      Finds the key of given length, column by column,
+                      and the chi-squared value of the resulting plaintext letters
+                      The plaintext histogram is built from the column histograms,
+                          so the ciphertext is not decrypted
+                      returns None if key_length is not positive
+        ---------------------------------------------------
+        """
+        if type(key_length) != int or key_length < 1:
+            return None
+        alphab = get_chars('lower')
+        total = [0]*26
+        key = ''
+        if isinstance(codes,CiphertextProfile):
+            counts = codes.get_column_counts(key_length)
+        else:
+            counts = Cryptanalysis._column_counts(codes,key_length)
+        for col in counts:
+            s = Cryptanalysis._best_shift(col)
+            key += alphab[s]
+            for i in range(26):
+                total[i] += col[(i + s) % 26]
+        return [key_length,Cryptanalysis._chi_squared_counts(total),key]
+
+    @staticmethod
+    def _decrypt_with(key,ciphertext):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   key (str)
+                      ciphertext (str)
+        Return:       plaintext (str)
+        Description:  Private helper function
+                      Decrypts using key as a running key
+                      (a single character key would otherwise use autokey)
+        ---------------------------------------------------
+        """
+        if len(key) == 1:
+            key = key*2
+        return Vigenere(key).decrypt(ciphertext)
+
+    @staticmethod
+    def _smallest_period(key):
+        """
+        ----------------------------------------------------
+        Static method
+        Parameters:   key (str)
+        Return:       key (str)
+        Description:  Private helper function
+                      Returns the shortest prefix of key that repeats into key
+                          e.g. 'lemonlemon' --> 'lemon'
+                      Both keys give the same running key decryption
+        ---------------------------------------------------
+        """
+        for L in range(1,len(key)):
+            if len(key) % L == 0 and key[:L]*(len(key)//L) == key:
+                return key[:L]
+        return key
+
+class GeneralVigenere:
+    """
+    ----------------------------------------------------
+    Cipher name: General Vigenere Cipher
+    Key:         (str): a keyword made of base characters
+    Type:        Polyalphabetic Substitution Cipher
+    Description: Vigenere cipher over any base defined in get_chars
+                     (lower, alphanum, pascii, unicode256, ...)
+                 The default key is 'k', or the first base character
+                     for a base without letters (special, nonalpha)
+                 Uses a running key: repeat the key
+                 Substitutes only base characters, others are kept as is
+                     and do not consume a key character
+                 Case sensitive (same as Shift)
+                 One substitution table is compiled per key character,
+                     so speed does not depend on the size of the base
+    ----------------------------------------------------
+    """
+
+    DEFAULT_KEY = 'k'
+    DEFAULT_BASE = 'lower'
+
+    def __init__(self,key=DEFAULT_KEY,base_type=DEFAULT_BASE):
+        """
+        ----------------------------------------------------
+        Parameters:   _key (str): default value: 'k'
+                      base_type (str): default value: 'lower'
+        Description:  General Vigenere constructor
+                      sets _base, _key and compiles substitution tables
+                      if invalid base_type, set to default base
+                      if invalid key, set to default key
+        ---------------------------------------------------
+        """
+        if base_type not in utilities.ENCODINGS:
+            base_type = self.DEFAULT_BASE
+        self._base_type = base_type
+        self._base = get_chars(base_type)
+        self.set_key(key)
+
+    def get_key(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       key (str)
+        Description:  Returns a copy of the General Vigenere key
+        ---------------------------------------------------
+        """
+        return self._state[0]
+
+    def get_base(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       base (str)
+        Description:  Returns a copy of the base characters
+        ---------------------------------------------------
+        """
+        return self._base
+
+    def set_key(self,key):
+        """
+        ----------------------------------------------------
+        Parameters:   key (str): non-empty string
+        Return:       success: True/False
+        Description:  Sets General Vigenere key to given key
+                      Characters not in base are removed from the key,
+                          unless their other case is in base
+                      Compiles one encryption and one decryption table
+                          per key character
+                      if invalid key --> set to default key
+        ---------------------------------------------------
+        """
+        if self.valid_key(key,self._base_type):
+            k = self._filter_key(key,self._base)
+            self._state = (k,) + self._compile(k,self._base)
+            return True
+        else:
+            if self.valid_key(self.DEFAULT_KEY,self._base_type):
+                k = self._filter_key(self.DEFAULT_KEY,self._base)
+            else:
+                k = self._base[0]
+            self._state = (k,) + self._compile(k,self._base)
+            return False
+
+    def __str__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       output (str)
+        Description:  Constructs and returns a string representation of
+                      General Vigenere object. Used for testing
+                      output format:
+                      General Vigenere Cipher:
+                      key = <key>
+                      base = <base>
+        ---------------------------------------------------
+        """
+        return 'General Vigenere Cipher:\nkey = {}\nbase = {}'.format(self._state[0],self._base)
+
+    @staticmethod
+    def valid_key(key,base_type=DEFAULT_BASE):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   key (?):
+                      base_type (str): default = 'lower'
+        Returns:      True/False
+        Description:  Checks if given key is a valid General Vigenere key
+                      A valid key is a string containing at least one
+                          base character (or its other case)
+        ---------------------------------------------------
+        """
+        if type(key) != str or base_type not in utilities.ENCODINGS:
+            return False
+        return GeneralVigenere._filter_key(key,get_chars(base_type)) != ''
+
+    @staticmethod
+    def _filter_key(key,base):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   key (str)
+                      base (str)
+        Return:       key (str)
+        Description:  Private helper function
+                      Keeps the key characters found in base
+                      A character not in base is replaced by its other case
+                          if that one is in base, otherwise it is removed
+        ---------------------------------------------------
+        """
+        index_map = get_index_map(base)
+        k = ''
+        for c in key:
+            for option in (c,c.lower(),c.upper()):
+                if len(option) == 1 and ord(option) in index_map:
+                    k += option
+                    break
+        return k
+
+    @staticmethod
+    def _compile(key,base):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   key (str): characters of base
+                      base (str)
+        Return:       tables (tuple): (encryption tables, decryption tables)
+        Description:  Private helper function
+                      Builds one {char: substitute} table per key character
+                      for encryption and for decryption
+                      Tables of repeated key characters are shared
+        ---------------------------------------------------
+        """
+        index_map = get_index_map(base)
+        l = len(base)
+        compiled = {}
+        enc = []
+        dec = []
+        for c in key:
+            if c not in compiled:
+                s = index_map[ord(c)]
+                compiled[c] = ({base[i]: base[(i + s) % l] for i in range(l)},
+                               {base[i]: base[(i - s) % l] for i in range(l)})
+            enc.append(compiled[c][0])
+            dec.append(compiled[c][1])
+        return enc,dec
+
+    @staticmethod
+    def _substitute(text,tables):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   text (str)
+                      tables (list): one {char: substitute} table per key position
+        Return:       result (str)
+        Description:  Private helper function
+                      Substitutes every character found in the current table
+                      and moves to the next table, other characters are kept
+        ---------------------------------------------------
+        """
+        result = []
+        k_l = len(tables)
+        j = 0
+        for c in text:
+            s = tables[j].get(c)
+            if s is None:
+                result.append(c)
+            else:
+                result.append(s)
+                j += 1
+                if j == k_l:
+                    j = 0
+        return ''.join(result)
+
+    def encrypt(self,plaintext):
+        """
+        ----------------------------------------------------
+        Parameters:   plaintext (str)
+        Return:       ciphertext (str)
+        Description:  Encryption using General Vigenere Cipher
+        Asserts:      plaintext is a string
+        ---------------------------------------------------
+        """
+        assert type(plaintext) == str, 'invalid plaintext'
+        return self._substitute(plaintext,self._state[1])
+
+    def decrypt(self,ciphertext):
+        """
+        ----------------------------------------------------
+        Parameters:   ciphertext (str)
+        Return:       plaintext (str)
+        Description:  Decryption using General Vigenere Cipher
+        Asserts:      ciphertext is a string
+        ---------------------------------------------------
+        """
+        assert type(ciphertext) == str, 'invalid input'
+        return self._substitute(ciphertext,self._state[2])
+
+class StreamingAnalyzer:
+    """
+    ----------------------------------------------------
+    Description: Online cryptanalysis of a Vigenere ciphertext
+                 The ciphertext is given in chunks using feed
+                 Keeps the letter histogram of every column
+                     for every key length 1..max_length
+                 IOC, Friedman, key lengths and key are computed
+                     from the histograms (no rescanning of old chunks)
+                 Only English letters are considered (case insensitive)
+    ----------------------------------------------------
+    """
+
+    DEFAULT_MAX_LENGTH = 20
+
+    def __init__(self,max_length=DEFAULT_MAX_LENGTH):
+        """
+        ----------------------------------------------------
+        Parameters:   max_length (int): largest key length to track
+                                        default = 20
+        Description:  StreamingAnalyzer constructor
+                      creates empty histograms
+        Asserts:      max_length is a positive integer
+        ---------------------------------------------------
+        """
+        assert type(max_length) == int and max_length > 0, 'invalid max_length'
+        self._max_length = max_length
+        self._n = 0
+        self._columns = [None] + [[[0]*26 for _ in range(L)] for L in range(1,max_length+1)]
+
+    def feed(self,chunk):
+        """
+        ----------------------------------------------------
+        Parameters:   chunk (str or bytes): next part of the ciphertext
+        Return:       -
+        Description:  Adds the letters of chunk to the histograms
+                      Letters are assigned to columns according to the
+                      number of letters received before this chunk
+        ---------------------------------------------------
+        """
+        codes = utilities.get_letter_codes(chunk)
+        if len(codes) == 0:
+            return
+        backend = utilities.get_backend()
+        for L in range(1,self._max_length+1):
+            hist = self._columns[L]
+            start = self._n % L
+            counts = backend.column_counts(codes,L)
+            for c in range(min(L,len(codes))):
+                column = hist[(start + c) % L]
+                for i in range(26):
+                    column[i] += counts[c][i]
+        self._n += len(codes)
+        return
+
+    def get_length(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       n (int)
+        Description:  Returns number of letters received so far
+        ---------------------------------------------------
+        """
+        return self._n
+
+    def get_histogram(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       counts (list): 26 letter counts
+        Description:  Returns a copy of the letter histogram of the ciphertext
+        ---------------------------------------------------
+        """
+        return list(self._columns[1][0])
+
+    def get_ioc(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       I (float)
+        Description:  Returns the index of coincidence of the letters so far
+        ---------------------------------------------------
+        """
+        return Cryptanalysis._ioc_counts(self._columns[1][0])
+
+    def get_friedman(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       list of two key lengths [int,int]
+        Description:  Friedman's test on the letters so far
+                      Same ordering as Cryptanalysis.friedman
+                      returns [0,0] if nothing was received
+        ---------------------------------------------------
+        """
+        if self._n < 2:
+            return [0,0]
+        return Cryptanalysis._friedman_lengths(self.get_ioc(),self._n)
+
+    def get_key_lengths(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       ranking (list): [[key_length,score],...]
+        Description:  Ranks the key lengths 1..max_length
+                      score is the average IOC of the columns
+                      Sorted by score (highest first),
+                          if equal, start with smaller key length
+        ---------------------------------------------------
+        """
+        ranking = []
+        for L in range(1,self._max_length+1):
+            score = sum([Cryptanalysis._ioc_counts(col) for col in self._columns[L]]) / L
+            ranking.append([L,score])
+        ranking.sort(key=lambda item: -item[1])
+        return ranking
+
+    def get_key(self,key_length=0):
+        """
+        ----------------------------------------------------
+        Parameters:   key_length (int): default = 0 (best key length,
+                          see Cryptanalysis._pick_key_length)
+        Return:       key (str)
+        Description:  Returns the most probable key of given length
+                      Each key character is the shift with the lowest
+                      chi-squared value for its column
+                      returns '' if nothing was received
+        Asserts:      key_length is within 0..max_length
+        ---------------------------------------------------
+        """
+        assert type(key_length) == int and 0 <= key_length <= self._max_length, 'invalid key_length'
+        if self._n == 0:
+            return ''
+        if key_length == 0:
+            key_length = Cryptanalysis._pick_key_length(self.get_key_lengths())
+        alphab = get_chars('lower')
+        return ''.join([alphab[Cryptanalysis._best_shift(col)] for col in self._columns[key_length]])
+
+class AnalysisCache:
+    """
+    ----------------------------------------------------
+    Description: Content-addressed cache for cryptanalysis results
+                 Entries are keyed by a sha256 hash of the cipher name,
+                     the analysis args and the ciphertext
+                 Two entries are stored per analysis:
+                     raw: hash of the ciphertext as given --> key, plaintext
+                     clean: hash of the cleaned ciphertext --> key, histograms
+                 A resubmission that only differs in white spaces (and
+                     punctuation for Vigenere) hits the clean entry
+                     and is decrypted with the cached key, no search is made
+                 Memory tier: LRU with a maximum number of entries
+                     and a maximum number of bytes, entries are kept
+                     as JSON text (an entry larger than memory_limit
+                     is only stored on disk)
+                 Disk tier (optional): one JSON file per entry in a directory,
+                     oldest files are removed when the directory exceeds disk_limit
+                     (the directory is scanned once, sizes are then tracked,
+                     files written by other processes are counted when read)
+                 Returned values are copies, changing them does not change the cache
+    ----------------------------------------------------
+    """
+
+    DEFAULT_SIZE = 256
+    DEFAULT_MEMORY_LIMIT = 16*1024*1024
+    DEFAULT_DISK_LIMIT = 64*1024*1024
+
+    def __init__(self,size=DEFAULT_SIZE,directory=None,disk_limit=DEFAULT_DISK_LIMIT,
+                 memory_limit=DEFAULT_MEMORY_LIMIT):
+        """
+        ----------------------------------------------------
+        Parameters:   size (int): max entries in memory, default = 256
+                      directory (str): disk tier directory, default = None (no disk tier)
+                      disk_limit (int): max bytes on disk, default = 64 MB
+                      memory_limit (int): max bytes in memory, default = 16 MB
+        Description:  AnalysisCache constructor
+                      creates directory if it does not exist
+        Asserts:      size and memory_limit are positive integers
+        ---------------------------------------------------
+        """
+        assert type(size) == int and size > 0, 'invalid size'
+        assert type(memory_limit) == int and memory_limit > 0, 'invalid memory_limit'
+        self._size = size
+        self._memory_limit = memory_limit
+        self._memory = OrderedDict()
+        self._memory_total = 0
+        self._directory = directory
+        self._disk_limit = disk_limit
+        self._disk = OrderedDict()
+        self._disk_total = 0
+        if directory is not None:
+            os.makedirs(directory,exist_ok=True)
+            files = []
+            for entry in os.scandir(directory):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime,entry.path,stat.st_size))
+            for mtime,path,size in sorted(files):
+                self._track_file(path,size)
+
+    @staticmethod
+    def make_key(cipher,text,args=None):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   cipher (str): cipher name
+                      text (str)
+                      args (?): analysis parameters, default = None
+        Return:       key (str): hexadecimal sha256 digest
+        Description:  Hashes the cipher name, the analysis args and the text
+        ---------------------------------------------------
+        """
+        h = hashlib.sha256()
+        h.update('{}\0{!r}\0'.format(cipher,args).encode('utf-8'))
+        h.update(text.encode('utf-8','surrogatepass'))
+        return h.hexdigest()
+
+    def get(self,key):
+        """
+        ----------------------------------------------------
+        Parameters:   key (str)
+        Return:       value (dict) or None: a copy of the cached value
+        Description:  Looks up key in memory, then on disk
+                      A disk hit is moved back to memory
+        ---------------------------------------------------
+        """
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            return json.loads(data)
+        if self._directory is None:
+            return None
+        filename = os.path.join(self._directory,key + '.json')
+        try:
+            with open(filename,'r') as infile:
+                data = infile.read()
+            value = json.loads(data)
+            os.utime(filename)
+        except (OSError,ValueError):
+            return None
+        self._track_file(filename,len(data))
+        self._remember(key,data)
+        return value
+
+    def put(self,key,value):
+        """
+        ----------------------------------------------------
+        Parameters:   key (str)
+                      value (dict): JSON serializable
+        Return:       -
+        Description:  Stores value in memory and on disk (if a directory is given)
+                      Evicts least recently used entries from both tiers
+        ---------------------------------------------------
+        """
+        data = json.dumps(value)
+        self._remember(key,data)
+        if self._directory is None:
+            return
+        filename = os.path.join(self._directory,key + '.json')
+        tmp = filename + '.tmp'
+        with open(tmp,'w') as outfile:
+            outfile.write(data)
+        os.replace(tmp,filename)
+        self._track_file(filename,len(data))
+        self._evict_disk()
+        return
+
+    def clear(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       -
+        Description:  Removes all entries from memory and disk
+        ---------------------------------------------------
+        """
+        self._memory.clear()
+        self._memory_total = 0
+        self._disk.clear()
+        self._disk_total = 0
+        if self._directory is not None:
+            for name in os.listdir(self._directory):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self._directory,name))
+        return
+
+    def _remember(self,key,data):
+        """
+        ----------------------------------------------------
+        Parameters:   key (str)
+                      data (str): JSON text of the value
+        Return:       -
+        Description:  Private helper function
+                      Adds data to the memory tier and evicts the
+                      least recently used entries
+        ---------------------------------------------------
+        """
+        old = self._memory.pop(key,None)
+        if old is not None:
+            self._memory_total -= len(old)
+        if len(data) > self._memory_limit:
+            return
+        self._memory[key] = data
+        self._memory_total += len(data)
+        while len(self._memory) > self._size or self._memory_total > self._memory_limit:
+            self._memory_total -= len(self._memory.popitem(last=False)[1])
+        return
+
+    def _track_file(self,path,size):
+        """
+        ----------------------------------------------------
+        Parameters:   path (str): file of the disk tier
+                      size (int): bytes
+        Return:       -
+        Description:  Private helper function
+                      Records path as the most recently used file
+                      and updates the disk total
+        ---------------------------------------------------
+        """
+        self._disk_total += size - self._disk.pop(path,0)
+        self._disk[path] = size
+        return
+
+    def _evict_disk(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       -
+        Description:  Private helper function
+                      Removes the least recently used files until the
+                      disk tier is within disk_limit
+        ---------------------------------------------------
+        """
+        while self._disk_total > self._disk_limit and len(self._disk) > 0:
+            path,size = self._disk.popitem(last=False)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._disk_total -= size
+        return
+
+    def cryptanalyze_shift(self,ciphertext,args=['',-1,-1]):
+        """
+        ----------------------------------------------------
+        Parameters:   ciphertext (string)
+                      args (list): same as Shift.cryptanalyze
+        Return:       key,plaintext
+        Description:  Cached Shift.cryptanalyze
+                      The clean entry holds the key and the histogram
+                          of the ciphertext without white spaces
+        ---------------------------------------------------
+        """
+        raw_key = self.make_key('shift-raw',ciphertext,args)
+        value = self.get(raw_key)
+        if value is not None:
+            return tuple(value['key']),value['plaintext']
+        cleaned = clean_text(ciphertext,' \n\t')
+        clean_key = self.make_key('shift',cleaned,args)
+        value = self.get(clean_key)
+        if value is not None and Shift.valid_key(tuple(value['key'])):
+            key = tuple(value['key'])
+            plaintext = Shift(key).decrypt(ciphertext)
+        else:
+            key,plaintext = Shift.cryptanalyze(ciphertext,args)
+            histogram = utilities.frequency_analysis(cleaned,Shift.BASE)
+            self.put(clean_key,{'key': key,'histogram': histogram})
+        self.put(raw_key,{'key': key,'plaintext': plaintext})
+        return key,plaintext
+
+    def cryptanalyze_vigenere(self,ciphertext):
+        """
+        ----------------------------------------------------
+        Parameters:   ciphertext (string)
+        Return:       key,plaintext
+        Description:  Cached Vigenere.cryptanalyze
+                      The clean entry holds the key, the letter histogram
+                          and the column histograms for the key length
+        ---------------------------------------------------
+        """
+        raw_key = self.make_key('vigenere-raw',ciphertext)
+        value = self.get(raw_key)
+        if value is not None:
+            return value['key'],value['plaintext']
+        un = get_chars('nonalpha') + ' ' + '\n' + '\t'
+        clean_key = self.make_key('vigenere',clean_text(ciphertext,un))
+        value = self.get(clean_key)
+        if value is not None and value['key'] != '':
+            key = value['key']
+            plaintext = Vigenere._decrypt_with(key,ciphertext)
+        else:
+            key,plaintext = Vigenere.cryptanalyze(ciphertext)
+            codes = utilities.get_letter_codes(ciphertext)
+            self.put(clean_key,{'key': key,
+                                'histogram': Cryptanalysis._column_counts(codes,1)[0],
+                                'columns': Cryptanalysis._column_counts(codes,max(len(key),1))})
+        self.put(raw_key,{'key': key,'plaintext': plaintext})
+        return key,plaintext
+
+    def get_histograms(self,cipher,ciphertext,args=['',-1,-1]):
+        """
+        ----------------------------------------------------
+        Parameters:   cipher (str): 'shift' or 'vigenere'
+                      ciphertext (string)
+                      args (list): Shift args, ignored for Vigenere
+        Return:       value (dict) or None
+        Description:  Returns the cached clean entry of a previous analysis
+                      (key and intermediate histograms), None if not cached
+        ---------------------------------------------------
+        """
+        if cipher == 'shift':
+            return self.get(self.make_key('shift',clean_text(ciphertext,' \n\t'),args))
+        un = get_chars('nonalpha') + ' ' + '\n' + '\t'
+        return self.get(self.make_key('vigenere',clean_text(ciphertext,un)))
+
+class RunningKeyIndex:
+    """
+    ----------------------------------------------------
+    Description: Running key (book cipher) attack on Vigenere Cipher
+                 The key is assumed to be a passage of a known corpus
+                 Builds an index of every n-gram of the corpus letters
+                 Search:
+                     For a sample of ciphertext positions, assume the plaintext
+                     is one of the most common corpus n-grams (probes),
+                     derive the key n-gram and look it up in the index
+                     Every hit votes for one corpus offset
+                     Only the offsets with most votes are decrypted and
+                     scored using chi-squared
+                 Offsets count corpus letters only
+    ----------------------------------------------------
+    """
+
+    DEFAULT_N = 4
+
+    def __init__(self,corpus,n=DEFAULT_N):
+        """
+        ----------------------------------------------------
+        Parameters:   corpus (str): candidate key texts
+                      n (int): n-gram size, default = 4
+        Description:  RunningKeyIndex constructor
+                      builds the n-gram index and the list of probes
+        Asserts:      corpus is a string and n is a positive integer
+        ---------------------------------------------------
+        """
+        assert type(corpus) == str, 'invalid corpus'
+        assert type(n) == int and n > 0, 'invalid n'
+        self._n = n
+        self._codes = utilities.get_letter_codes(corpus)
+        index = {}
+        codes = self._codes
+        for i in range(len(codes)-n+1):
+            gram = codes[i:i+n]
+            positions = index.get(gram)
+            if positions is None:
+                index[gram] = [i]
+            else:
+                positions.append(i)
+        self._index = index
+        self._probes = sorted(index,key=lambda gram: -len(index[gram]))
+
+    def get_length(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       n (int)
+        Description:  Returns number of letters in the corpus
+        ---------------------------------------------------
+        """
+        return len(self._codes)
+
+    def get_key(self,offset,length):
+        """
+        ----------------------------------------------------
+        Parameters:   offset (int)
+                      length (int)
+        Return:       key (str)
+        Description:  Returns length corpus letters starting at offset
+        ---------------------------------------------------
+        """
+        alphab = get_chars('lower')
+        return ''.join([alphab[x] for x in self._codes[offset:offset+length]])
+
+    def search(self,ciphertext,top=5,probes=50,sample=200,candidates=100):
+        """
+        ----------------------------------------------------
+        Parameters:   ciphertext (str or CiphertextProfile)
+                      top (int): number of results, default = 5
+                      probes (int): most common corpus n-grams tried as plaintext,
+                          default = 50
+                      sample (int): ciphertext positions probed, default = 200
+                      candidates (int): offsets scored after voting, default = 100
+        Return:       results (list): [[offset,chi,votes],...]
+        Description:  Finds the corpus offsets that are most probably the key
+                      chi is the chi-squared value per plaintext letter
+                      Sorted by chi (lowest first)
+        ---------------------------------------------------
+        """
+        if isinstance(ciphertext,CiphertextProfile):
+            c = ciphertext.get_codes()
+        else:
+            c = utilities.get_letter_codes(ciphertext)
+        n = self._n
+        length = len(c)
+        last = len(self._codes) - length
+        if length < n or last < 0:
+            return []
+        grams = self._probes[:probes]
+        votes = {}
+        for i in range(min(sample,length-n+1)):
+            window = c[i:i+n]
+            for gram in grams:
+                key = bytes([(window[t] - gram[t]) % 26 for t in range(n)])
+                for pos in self._index.get(key,()):
+                    o = pos - i
+                    if 0 <= o <= last:
+                        votes[o] = votes.get(o,0) + 1
+        best = sorted(votes,key=lambda o: (-votes[o],o))[:candidates]
+        results = []
+        for o in best:
+            backend = utilities.get_backend()
+            counts = backend.histogram(backend.shift(c,self._codes[o:o+length],-1))
+            results.append([o,Cryptanalysis._chi_squared_counts(counts) / length,votes[o]])
+        results.sort(key=lambda item: (item[1],item[0]))
+        return results[:top]
+
+class GroundTruth:
+    """
+    ----------------------------------------------------
+    Description: Synthetic plaintext/ciphertext pairs with known keys
+                 and a harness measuring recovery rate and runtime
+                 of the cryptanalysis functions
+                 Generation is deterministic for a given seed
+                 Plaintext is made of pseudo-words, letters are drawn
+                     using ENGLISH_FREQ
+    ----------------------------------------------------
+    """
+
+    PUNCTUATION = ',.;:!?-"()'
+    DEFAULT_LENGTHS = [200,1000,5000]
+    DEFAULT_KEY_LENGTHS = [3,5,8,13]
+    DEFAULT_DENSITIES = [0.0,0.1,0.3]
+
+    @staticmethod
+    def make_plaintext(length,density,rng):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   length (int): number of letters
+                      density (float): probability of punctuation after a word
+                      rng (random.Random)
+        Return:       plaintext (str)
+        Description:  Generates a plaintext of pseudo-words of 1 to 9 letters
+                      A word is followed by a punctuation character with
+                      probability density, sentences start with an upper case letter
+        ---------------------------------------------------
+        """
+        alphab = get_chars('lower')
+        letters = rng.choices(alphab,weights=ENGLISH_FREQ,k=length)
+        words = []
+        i = 0
+        capital = True
+        while i < length:
+            size = rng.randint(1,9)
+            word = ''.join(letters[i:i+size])
+            i += size
+            if capital:
+                word = word.capitalize()
+                capital = False
+            if rng.random() < density:
+                mark = rng.choice(GroundTruth.PUNCTUATION)
+                word += mark
+                capital = mark in '.!?'
+            words.append(word)
+        return ' '.join(words)
+
+    @staticmethod
+    def generate(lengths=DEFAULT_LENGTHS,key_lengths=DEFAULT_KEY_LENGTHS,
+                 densities=DEFAULT_DENSITIES,samples=3,seed=0):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   lengths (list): text lengths (letters)
+                      key_lengths (list): Vigenere key lengths
+                      densities (list): punctuation densities
+                      samples (int): cases per grid point, default = 3
+                      seed (int): default = 0
+        Return:       cases (list of dict):
+                          cipher, length, key_length, density, key, plaintext, ciphertext
+        Description:  Generates Vigenere cases for every (length, key_length, density)
+                      and Shift cases (lower case base) for every (length, density)
+                      A Vigenere key of one character is applied as a running key
+        ---------------------------------------------------
+        """
+        rng = random.Random(seed)
+        alphab = get_chars('lower')
+        cases = []
+        for length in lengths:
+            for density in densities:
+                for key_length in key_lengths:
+                    for _ in range(samples):
+                        plaintext = GroundTruth.make_plaintext(length,density,rng)
+                        key = ''.join(rng.choices(alphab,k=key_length))
+                        cipher = Vigenere(key if key_length > 1 else key*2)
+                        cases.append({'cipher': 'vigenere','length': length,
+                                      'key_length': key_length,'density': density,
+                                      'key': key,'plaintext': plaintext,
+                                      'ciphertext': cipher.encrypt(plaintext)})
+                for _ in range(samples):
+                    plaintext = GroundTruth.make_plaintext(length,density,rng)
+                    key = (rng.randint(1,25),26,51)
+                    cases.append({'cipher': 'shift','length': length,'key_length': 1,
+                                  'density': density,'key': key,'plaintext': plaintext,
+                                  'ciphertext': Shift(key).encrypt(plaintext)})
+        return cases
+
+    @staticmethod
+    def get_methods():
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   -
+        Return:       methods (dict): {name: (cipher, function)}
+        Description:  Methods evaluated by the harness
+                      function(case) returns True if the method recovered
+                      the key length (estimators) or the plaintext (cryptanalysis)
+        ---------------------------------------------------
+        """
+        lower = get_chars('lower')
+        return {
+            'friedman': ('vigenere',
+                lambda case: case['key_length'] in Cryptanalysis.friedman(case['ciphertext'])),
+            'cipher_shifting': ('vigenere',
+                lambda case: case['key_length'] in Cryptanalysis.cipher_shifting(case['ciphertext'])),
+            'rank_key_lengths': ('vigenere',
+                lambda case: Cryptanalysis._pick_key_length(
+                    Cryptanalysis.rank_key_lengths(case['ciphertext'])) == case['key_length']),
+            'hamming_key_length': ('vigenere',
+                lambda case: Cryptanalysis.hamming_key_length(case['ciphertext'])[0][0] == case['key_length']),
+            'Vigenere.cryptanalyze': ('vigenere',
+                lambda case: Vigenere.cryptanalyze(case['ciphertext'])[1] == case['plaintext']),
+            'Shift.cryptanalyze': ('shift',
+                lambda case: Shift.cryptanalyze(case['ciphertext'],[lower,-1,-1])[1] == case['plaintext']),
+        }
+
+    @staticmethod
+    def evaluate(cases,methods=None):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   cases (list): output of GroundTruth.generate
+                      methods (list): method names, default = None (all methods)
+        Return:       rows (list of dict): method, length, key_length, density,
+                          cases, recovery (rate), seconds (average per case)
+        Description:  Runs every method over the cases of its cipher
+                      Results are grouped by method, text length, key length
+                          and density (Shift cases have key_length 1)
+                      A method raising an error counts as not recovered
+        ---------------------------------------------------
+        """
+        available = GroundTruth.get_methods()
+        if methods is None:
+            methods = list(available)
+        groups = OrderedDict()
+        for name in methods:
+            cipher,function = available[name]
+            for case in cases:
+                if case['cipher'] != cipher:
+                    continue
+                start = time.perf_counter()
+                try:
+                    ok = bool(function(case))
+                except Exception:
+                    ok = False
+                elapsed = time.perf_counter() - start
+                key = (name,case['length'],case['key_length'],case['density'])
+                group = groups.setdefault(key,[0,0,0.0])
+                group[0] += 1
+                group[1] += ok
+                group[2] += elapsed
+        rows = []
+        for (name,length,key_length,density),(count,recovered,seconds) in groups.items():
+            rows.append({'method': name,'length': length,'key_length': key_length,
+                         'density': density,'cases': count,
+                         'recovery': recovered / count,'seconds': seconds / count})
+        return rows
+
+    @staticmethod
+    def report(rows):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   rows (list): output of GroundTruth.evaluate
+        Return:       output (str)
+        Description:  Formats the rows as a table, one line per row
+        ---------------------------------------------------
+        """
+        output = '{:<22}{:>8}{:>12}{:>9}{:>7}{:>10}{:>12}'.format(
+            'method','length','key_length','density','cases','recovery','seconds')
+        for row in rows:
+            output += '\n{:<22}{:>8}{:>12}{:>9.2f}{:>7}{:>10.2f}{:>12.6f}'.format(
+                row['method'],row['length'],row['key_length'],row['density'],row['cases'],
+                row['recovery'],row['seconds'])
+        return output
+
+class KeyRing:
+    """
+    ----------------------------------------------------
+    Description: Compact store of many Vigenere keys
+                 Keys are normalized once (as in Vigenere.set_key)
+                     and stored as shifts (0-25), one byte per key character,
+                     in one contiguous buffer
+                 An offset index gives the start of every key
+                 Encryption and decryption are made by key id,
+                     no Vigenere object is created
+                 Uses the running key method for all keys
+    ----------------------------------------------------
+    """
+
+    def __init__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Description:  KeyRing constructor
+                      creates an empty key ring
+        ---------------------------------------------------
+        """
+        self._shifts = bytearray()
+        self._offsets = array('Q',[0])
+
+    def __len__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       n (int)
+        Description:  Returns number of keys in the ring
+        ---------------------------------------------------
+        """
+        return len(self._offsets) - 1
+
+    def add(self,key):
+        """
+        ----------------------------------------------------
+        Parameters:   key (str): valid Vigenere key
+        Return:       key_id (int)
+        Description:  Normalizes key and appends it to the ring
+                      All non-alpha characters are removed from the key
+                      key is converted to lower case
+        Asserts:      key is a valid Vigenere key
+        ---------------------------------------------------
+        """
+        assert Vigenere.valid_key(key), 'invalid key'
+        codes = utilities.get_letter_codes(key)
+        assert len(codes) > 0, 'invalid key'
+        self._shifts += codes
+        self._offsets.append(len(self._shifts))
+        return len(self._offsets) - 2
+
+    def get_key(self,key_id):
+        """
+        ----------------------------------------------------
+        Parameters:   key_id (int)
+        Return:       key (str)
+        Description:  Returns the normalized key of given id
+        ---------------------------------------------------
+        """
+        alphab = get_chars('lower')
+        return ''.join([alphab[s] for s in self._get_shifts(key_id)])
+
+    def get_handle(self,key_id):
+        """
+        ----------------------------------------------------
+        Parameters:   key_id (int)
+        Return:       handle (KeyHandle)
+        Description:  Returns a lightweight handle to the key of given id
+        ---------------------------------------------------
+        """
+        self._get_shifts(key_id)
+        return KeyHandle(self,key_id)
+
+    def get_size(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       size (int)
+        Description:  Returns number of bytes used by the key buffer
+                      and the offset index
+        ---------------------------------------------------
+        """
+        return len(self._shifts) + self._offsets.itemsize*len(self._offsets)
+
+    def encrypt(self,key_id,plaintext):
+        """
+        ----------------------------------------------------
+        Parameters:   key_id (int)
+                      plaintext (str)
+        Return:       ciphertext (str)
+        Description:  Encryption using the key of given id
+        Asserts:      plaintext is a string
+        ---------------------------------------------------
+        """
+        assert type(plaintext) == str, 'invalid plaintext'
+        tables = utilities.get_shift_tables('e')
+        return GeneralVigenere._substitute(plaintext,[tables[s] for s in self._get_shifts(key_id)])
+
+    def decrypt(self,key_id,ciphertext):
+        """
+        ----------------------------------------------------
+        Parameters:   key_id (int)
+                      ciphertext (str)
+        Return:       plaintext (str)
+        Description:  Decryption using the key of given id
+        Asserts:      ciphertext is a string
+        ---------------------------------------------------
+        """
+        assert type(ciphertext) == str, 'invalid input'
+        tables = utilities.get_shift_tables('d')
+        return GeneralVigenere._substitute(ciphertext,[tables[s] for s in self._get_shifts(key_id)])
+
+    def _get_shifts(self,key_id):
+        """
+        ----------------------------------------------------
+        Parameters:   key_id (int)
+        Return:       shifts (bytearray)
+        Description:  Private helper function
+                      Returns the shifts of the key of given id
+        Asserts:      key_id is a valid id
+        ---------------------------------------------------
+        """
+        assert type(key_id) == int and 0 <= key_id < len(self), 'invalid key id'
+        return self._shifts[self._offsets[key_id]:self._offsets[key_id+1]]
+
+class KeyHandle:
+    """
+    ----------------------------------------------------
+    Description: Lightweight reference to one key of a KeyRing
+                 Holds only the ring and the key id
+    ----------------------------------------------------
+    """
+
+    __slots__ = ('_ring','_id')
+
+    def __init__(self,ring,key_id):
+        """
+        ----------------------------------------------------
+        Parameters:   ring (KeyRing)
+                      key_id (int)
+        Description:  KeyHandle constructor
+        ---------------------------------------------------
+        """
+        self._ring = ring
+        self._id = key_id
+
+    def get_id(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       key_id (int)
+        Description:  Returns the key id
+        ---------------------------------------------------
+        """
+        return self._id
+
+    def get_key(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       key (str)
+        Description:  Returns the normalized key
+        ---------------------------------------------------
+        """
+        return self._ring.get_key(self._id)
+
+    def encrypt(self,plaintext):
+        """
+        ----------------------------------------------------
+        Parameters:   plaintext (str)
+        Return:       ciphertext (str)
+        Description:  Same as KeyRing.encrypt for this key
+        ---------------------------------------------------
+        """
+        return self._ring.encrypt(self._id,plaintext)
+
+    def decrypt(self,ciphertext):
+        """
+        ----------------------------------------------------
+        Parameters:   ciphertext (str)
+        Return:       plaintext (str)
+        Description:  Same as KeyRing.decrypt for this key
+        ---------------------------------------------------
+        """
+        return self._ring.decrypt(self._id,ciphertext)
+
+class BatchRunner:
+    """
+    ----------------------------------------------------
+    Description: Runs many cryptanalysis jobs in a process pool
+                 A job is a dict (one JSON line):
+                     id: any value, copied to the result
+                     cipher: 'shift' or 'vigenere'
+                     ciphertext: str
+                     args: Shift.cryptanalyze args (shift only, optional)
+                         [base (str),shifts (int),base_length (int)]
+                     key_length: use Vigenere.hill_climb for this length (optional)
+                         a positive integer
+                 Idle workers take the next job as soon as they finish one
+                     and the largest buffered job is sent first,
+                     so a large job does not end up last behind small ones
+                 Each job has a timeout (seconds) and each worker
+                     a memory limit (bytes, Unix only)
+                 Results are produced as soon as they finish:
+                     id, cipher, key, plaintext, seconds, error
+    ----------------------------------------------------
+    """
+
+    DEFAULT_TIMEOUT = 60
+    DEFAULT_WINDOW = 64
+
+    def __init__(self,processes=None,timeout=DEFAULT_TIMEOUT,memory_limit=None,window=DEFAULT_WINDOW):
+        """
+        ----------------------------------------------------
+        Parameters:   processes (int): worker processes, default = None (one per core)
+                      timeout (float): seconds per job, default = 60 (None: no timeout)
+                      memory_limit (int): bytes per worker, default = None (no limit)
+                      window (int): jobs buffered for size ordering, default = 64
+        Description:  BatchRunner constructor
+        ---------------------------------------------------
+        """
+        self._processes = processes if processes is not None else (os.cpu_count() or 1)
+        self._timeout = timeout
+        self._memory_limit = memory_limit
+        self._window = max(window,1)
+
+    def run(self,jobs):
+        """
+        ----------------------------------------------------
+        Parameters:   jobs (iterable of dict)
+        Return:       generator of results (dict), in order of completion
+        Description:  Runs the jobs in the process pool
+                      At most 2 jobs per worker are queued at a time,
+                      the largest buffered job is queued first
+        ---------------------------------------------------
+        """
+        jobs = iter(jobs)
+        buffered = []
+        count = 0
+        pending = set()
+        executor = ProcessPoolExecutor(max_workers=self._processes,
+                                       initializer=BatchRunner._init_worker,
+                                       initargs=(self._memory_limit,))
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(buffered) < self._window:
+                    job = next(jobs,None)
+                    if job is None:
+                        exhausted = True
+                        break
+                    # invalid ciphertexts are reported by _run_job
+                    ciphertext = job.get('ciphertext')
+                    size = len(ciphertext) if type(ciphertext) == str else 0
+                    heapq.heappush(buffered,(-size,count,job))
+                    count += 1
+                while buffered and len(pending) < 2*self._processes:
+                    job = heapq.heappop(buffered)[2]
+                    pending.add(executor.submit(BatchRunner._run_job,job,self._timeout))
+                if not pending:
+                    break
+                done,pending = wait(pending,return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            executor.shutdown(wait=True,cancel_futures=True)
+
+    def run_jsonl(self,infile,outfile):
+        """
+        ----------------------------------------------------
+        Parameters:   infile (file): JSON lines of jobs
+                      outfile (file): JSON lines of results
+        Return:       count (int): number of results written
+        Description:  Reads jobs from infile and writes each result to outfile
+                      as soon as it is available
+                      An invalid line produces a result with an error
+        ---------------------------------------------------
+        """
+        count = 0
+        for result in self.run(BatchRunner._read_jobs(infile)):
+            outfile.write(json.dumps(result) + '\n')
+            outfile.flush()
+            count += 1
+        return count
+
+    @staticmethod
+    def _read_jobs(infile):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   infile (file): JSON lines
+        Return:       generator of jobs (dict)
+        Description:  Private helper function
+                      Skips empty lines, invalid lines become jobs with an error
+        ---------------------------------------------------
+        """
+        for number,line in enumerate(infile,1):
+            if line.strip() == '':
+                continue
+            try:
+                job = json.loads(line)
+                if type(job) != dict:
+                    raise ValueError('job is not an object')
+            except ValueError as e:
+                job = {'id': 'line {}'.format(number),'error': 'invalid job: {}'.format(e)}
+            yield job
+
+    @staticmethod
+    def _init_worker(memory_limit):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   memory_limit (int): bytes or None
+        Return:       -
+        Description:  Private helper function
+                      Worker initializer, sets the address space limit
+        ---------------------------------------------------
+        """
+        if memory_limit is not None and resource is not None:
+            resource.setrlimit(resource.RLIMIT_AS,(memory_limit,memory_limit))
+        return
+
+    @staticmethod
+    def _timeout_handler(signum,frame):
+        """
+        ----------------------------------------------------
+        Static Method
+        Description:  Private helper function
+                      Alarm signal handler, stops the current job
+        ---------------------------------------------------
+        """
+        raise TimeoutError('job timed out')
+
+    @staticmethod
+    def _run_job(job,timeout):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   job (dict)
+                      timeout (float): seconds or None
+        Return:       result (dict): id, cipher, key, plaintext, seconds, error
+        Description:  Private helper function
+                      Runs one job in a worker process
+                      Errors, timeouts and memory errors are reported in
+                      the result, the worker is kept for the next job
+        ---------------------------------------------------
+        """
+        result = {'id': job.get('id'),'cipher': job.get('cipher'),'key': None,
+                  'plaintext': None,'seconds': 0.0,'error': job.get('error')}
+        if result['error'] is not None:
+            return result
+        use_alarm = timeout is not None and hasattr(signal,'SIGALRM')
+        start = time.perf_counter()
+        try:
+            if use_alarm:
+                signal.signal(signal.SIGALRM,BatchRunner._timeout_handler)
+                signal.setitimer(signal.ITIMER_REAL,timeout)
+            ciphertext = job.get('ciphertext')
+            if type(ciphertext) != str or ciphertext == '':
+                raise ValueError('invalid ciphertext')
+            if job.get('cipher') == 'shift':
+                args = job.get('args',[get_chars('lower'),-1,-1])
+                if type(args) != list or len(args) != 3 or type(args[0]) != str or \
+                        type(args[1]) != int or type(args[2]) != int:
+                    raise ValueError('invalid args: expected [base,shifts,base_length]')
+                key,plaintext = Shift.cryptanalyze(ciphertext,args)
+            elif job.get('cipher') == 'vigenere':
+                if job.get('key_length') is not None:
+                    key_length = job['key_length']
+                    if type(key_length) != int or key_length < 1:
+                        raise ValueError('invalid key_length: expected a positive integer')
+                    key,plaintext = Vigenere.hill_climb(ciphertext,key_length)
+                else:
+                    key,plaintext = Vigenere.cryptanalyze(ciphertext)
+            else:
+                raise ValueError('unknown cipher: {}'.format(job.get('cipher')))
+            result['key'] = key
+            result['plaintext'] = plaintext
+        except MemoryError:
+            result['error'] = 'memory limit exceeded'
+        except Exception as e:
+            result['error'] = '{}: {}'.format(type(e).__name__,e)
+        finally:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL,0)
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+class SharedCiphertext:
+    """
+    ----------------------------------------------------
+    Description: Letter codes of a ciphertext in shared memory
+                 The ciphertext is cleaned once (output of get_letter_codes)
+                     and copied once into multiprocessing.shared_memory
+                 Worker processes attach to it by name and get a zero-copy view,
+                     only the name and the size are sent to them
+                 The creating object owns the memory and frees it on close
+                 Can be used as a context manager
+    ----------------------------------------------------
+    """
+
+    def __init__(self,text):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str or bytes): ciphertext
+        Description:  SharedCiphertext constructor
+                      creates the shared memory block and copies the letter codes
+        ---------------------------------------------------
+        """
+        codes = utilities.get_letter_codes(text)
+        self._size = len(codes)
+        self._shm = shared_memory.SharedMemory(create=True,size=max(self._size,1))
+        self._shm.buf[:self._size] = codes
+        self._owner = True
+
+    @staticmethod
+    def attach(name,size):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   name (str): shared memory name (output of get_name)
+                      size (int): number of letters (output of get_size)
+        Return:       shared (SharedCiphertext)
+        Description:  Attaches to a shared ciphertext created by another process
+                      The attached object does not free the memory
+        ---------------------------------------------------
+        """
+        shared = SharedCiphertext.__new__(SharedCiphertext)
+        shared._size = size
+        shared._shm = shared_memory.SharedMemory(name=name)
+        shared._owner = False
+        return shared
+
+    def get_name(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       name (str)
+        Description:  Returns the shared memory name
+        ---------------------------------------------------
+        """
+        return self._shm.name
+
+    def get_size(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       size (int)
+        Description:  Returns number of letters
+        ---------------------------------------------------
+        """
+        return self._size
+
+    def get_codes(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       codes (memoryview or numpy array)
+        Description:  Returns a zero-copy view of the letter codes
+                      A uint8 NumPy array if NumPy is available
+        ---------------------------------------------------
+        """
+        view = self._shm.buf[:self._size]
+        if np is None:
+            return view
+        return np.frombuffer(view,dtype=np.uint8)
+
+    def close(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       -
+        Description:  Closes the view, frees the memory if this object created it
+                      Views returned by get_codes should not be used after close
+        ---------------------------------------------------
+        """
+        if self._shm is None:
+            return
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
+        return
+
+    def __enter__(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       self
+        Description:  Context manager entry
+        ---------------------------------------------------
+        """
+        return self
+
+    def __exit__(self,*exc):
+        """
+        ----------------------------------------------------
+        Parameters:   exception information (ignored)
+        Return:       False
+        Description:  Context manager exit, calls close
+        ---------------------------------------------------
+        """
+        self.close()
+        return False
+
+    def map(self,function,tasks,processes=None):
+        """
+        ----------------------------------------------------
+        Parameters:   function: picklable function(codes,task)
+                          codes is the zero-copy view of the letter codes
+                      tasks (list)
+                      processes (int): default = None (one per core)
+        Return:       results (list): function(codes,task) for every task, in order
+        Description:  Runs function over tasks in worker processes
+                      Workers attach to the shared codes, the ciphertext
+                      is never pickled
+        ---------------------------------------------------
+        """
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(SharedCiphertext._run,self.get_name(),self._size,function,task)
+                       for task in tasks]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def _run(name,size,function,task):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   name (str), size (int): shared ciphertext
+                      function, task: see SharedCiphertext.map
+        Return:       function(codes,task)
+        Description:  Private helper function
+                      Worker side of SharedCiphertext.map
+        ---------------------------------------------------
+        """
+        shared = SharedCiphertext.attach(name,size)
+        try:
+            codes = shared.get_codes()
+            result = function(codes,task)
+            del codes
+            return result
+        finally:
+            shared.close()
+
+    def column_counts(self,key_length,processes=None):
+        """
+        ----------------------------------------------------
+        Parameters:   key_length (int)
+                      processes (int): default = None (one per core)
+        Return:       counts (2D list): key_length x 26 letter counts
+        Description:  Column histograms computed in parallel,
+                      the columns are spread over the workers
+        Asserts:      key_length is a positive integer
+        ---------------------------------------------------
+        """
+        assert type(key_length) == int and key_length > 0, 'invalid key_length'
+        workers = processes if processes is not None else (os.cpu_count() or 1)
+        tasks = [(key_length,list(range(w,key_length,workers))) for w in range(min(workers,key_length))]
+        counts = [None]*key_length
+        for task,result in zip(tasks,self.map(SharedCiphertext._count_columns,tasks,processes)):
+            for c,col in zip(task[1],result):
+                counts[c] = col
+        return counts
+
+    @staticmethod
+    def _count_columns(codes,task):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   codes (memoryview or numpy array)
+                      task (tuple): key_length, list of columns
+        Return:       counts (2D list): histogram of each column
+        Description:  Private helper function
+        ---------------------------------------------------
+        """
+        L,columns = task
+        backend = utilities.get_backend()
+        return [backend.histogram(codes[c::L]) for c in columns]
+
+class KeyPhaseIndex:
+    """
+    ----------------------------------------------------
+    Description: Sparse index of a Vigenere encrypted file
+                 Records checkpoints (byte offset, letters before offset)
+                     every interval bytes
+                 With it, the key position of any byte is found by reading
+                     at most interval bytes, so a slice can be decrypted
+                     without decrypting what comes before it
+                 Letters are English letters (ASCII), as used by Vigenere
+                 Saved in a sidecar file: <filename>.vgidx
+                     with the size and modification time of the file,
+                     a sidecar file that does not match them is not loaded
+    ----------------------------------------------------
+    """
+
+    DEFAULT_INTERVAL = 64*1024
+    EXTENSION = '.vgidx'
+    MAGIC = b'VGI2'
+
+    def __init__(self,interval=DEFAULT_INTERVAL):
+        """
+        ----------------------------------------------------
+        Parameters:   interval (int): bytes between checkpoints, default = 64 KB
+        Description:  KeyPhaseIndex constructor
+                      creates an index with one checkpoint (0,0)
+        Asserts:      interval is a positive integer
+        ---------------------------------------------------
+        """
+        assert type(interval) == int and interval > 0, 'invalid interval'
+        self._interval = interval
+        self._checkpoints = array('Q',[0])
+        self._position = 0
+        self._letters = 0
+
+    def update(self,data):
+        """
+        ----------------------------------------------------
+        Parameters:   data (bytes): next bytes of the file
+        Return:       -
+        Description:  Adds checkpoints for data, in file order
+                      Used to build the index while the file is written
+        ---------------------------------------------------
+        """
+        i = 0
+        while True:
+            boundary = len(self._checkpoints)*self._interval - self._position
+            if boundary > len(data):
+                break
+            self._letters += len(utilities.get_letter_codes(data[i:boundary]))
+            self._checkpoints.append(self._letters)
+            i = boundary
+        self._letters += len(utilities.get_letter_codes(data[i:]))
+        self._position += len(data)
+        return
+
+    def locate(self,offset):
+        """
+        ----------------------------------------------------
+        Parameters:   offset (int): byte offset
+        Return:       checkpoint (int), letters (int)
+        Description:  Returns the last checkpoint at or before offset
+                      and the number of letters before it
+        ---------------------------------------------------
+        """
+        i = min(offset // self._interval,len(self._checkpoints) - 1)
+        return i*self._interval,self._checkpoints[i]
+
+    def save(self,filename):
+        """
+        ----------------------------------------------------
+        Parameters:   filename (str): encrypted file (index goes to filename.vgidx)
+        Return:       -
+        Description:  Writes the index to its sidecar file
+                      The header has the number of bytes indexed and the
+                          modification time of filename (call after the file
+                          is written and closed)
+        ---------------------------------------------------
+        """
+        mtime = os.stat(filename).st_mtime_ns
+        with open(filename + self.EXTENSION,'wb') as outfile:
+            outfile.write(self.MAGIC)
+            outfile.write(struct.pack('<QQQq',self._interval,len(self._checkpoints),
+                                      self._position,mtime))
+            outfile.write(self._checkpoints.tobytes() if sys.byteorder == 'little'
+                          else KeyPhaseIndex._swapped(self._checkpoints).tobytes())
+        return
+
+    @staticmethod
+    def load(filename):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   filename (str): encrypted file
+        Return:       index (KeyPhaseIndex) or None if no valid sidecar file
+        Description:  Reads the index of filename from its sidecar file
+                      returns None if filename was changed since the index
+                          was saved (other size or modification time)
+        ---------------------------------------------------
+        """
+        try:
+            stat = os.stat(filename)
+            with open(filename + KeyPhaseIndex.EXTENSION,'rb') as infile:
+                if infile.read(4) != KeyPhaseIndex.MAGIC:
+                    return None
+                interval,count,size,mtime = struct.unpack('<QQQq',infile.read(32))
+                checkpoints = array('Q')
+                checkpoints.frombytes(infile.read(8*count))
+        except (OSError,struct.error,ValueError):
+            return None
+        if len(checkpoints) != count or count == 0 or interval == 0:
+            return None
+        if size != stat.st_size or mtime != stat.st_mtime_ns:
+            return None
+        if sys.byteorder != 'little':
+            checkpoints = KeyPhaseIndex._swapped(checkpoints)
+        index = KeyPhaseIndex(interval)
+        index._checkpoints = checkpoints
+        index._position = size
+        return index
+
+    @staticmethod
+    def build(filename,interval=DEFAULT_INTERVAL,save=True):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   filename (str): encrypted file
+                      interval (int): default = 64 KB
+                      save (bool): write the sidecar file, default = True
+        Return:       index (KeyPhaseIndex)
+        Description:  Builds the index of an existing file in one scan
+        ---------------------------------------------------
+        """
+        index = KeyPhaseIndex(interval)
+        with open(filename,'rb') as infile:
+            data = infile.read(utilities.DEFAULT_CHUNK_SIZE)
+            while data:
+                index.update(data)
+                data = infile.read(utilities.DEFAULT_CHUNK_SIZE)
+        if save:
+            index.save(filename)
+        return index
+
+    @staticmethod
+    def _swapped(checkpoints):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   checkpoints (array)
+        Return:       copy (array) with swapped byte order
+        Description:  Private helper function, the file is little endian
+        ---------------------------------------------------
+        """
+        copy = array('Q',checkpoints)
+        copy.byteswap()
+        return copy
+
+class LanguageModel:
+    """
+    ----------------------------------------------------
+    Description: Language statistics (n-gram tables) of a plaintext language
+                 Built by streaming a local corpus in parallel chunks,
+                     for any alphabet of utilities.get_chars
+                 Tables hold log10 probabilities, in the format of
+                     Cryptanalysis.ngram_table: the n-gram of codes x1..xn
+                     is found at index x1*m**(n-1) + ... + xn (m = alphabet size)
+                     n-grams not in the corpus get log10(0.01/total)
+                 Characters outside the alphabet are skipped
+                     if the alphabet has only one case, the other case is folded
+                 Saved in a compact binary file that loads without parsing
+                 A model of base 'lower' can replace ENGLISH_FREQ:
+                     Cryptanalysis.chi_squared(text,model)
+                     Vigenere.hill_climb(ciphertext,L,model)
+                     Cryptanalysis.trial_decrypt(ciphertext,keys,table=model)
+                     (both use the quadgram table, see their order parameter;
+                     sparse tables are not supported)
+    ----------------------------------------------------
+    """
+
+    DEFAULT_ORDERS = (1,2,4)
+    DENSE_LIMIT = 1 << 22
+    MAGIC = b'VGLM'
+
+    def __init__(self,base='lower'):
+        """
+        ----------------------------------------------------
+        Parameters:   base (str): base type of utilities.get_chars, default = 'lower'
+        Description:  LanguageModel constructor
+                      creates a model with no tables
+        Asserts:      base is a valid base type
+        ---------------------------------------------------
+        """
+        assert type(base) == str and base != '' and get_chars(base) != '', 'invalid base'
+        self._base = base
+        self._alphabet = get_chars(base)
+        self._tables = {}
+        table = {}
+        for i in range(len(self._alphabet) - 1,-1,-1):
+            c = self._alphabet[i]
+            table[ord(c)] = chr(i)
+            for f in (c.lower(),c.upper()):
+                if len(f) == 1 and f not in self._alphabet:
+                    table[ord(f)] = chr(i)
+        self._translation = table
+        chars = ''.join([chr(x) for x in table])
+        self._pattern = re.compile('[^{}]+'.format(re.escape(chars)))
+
+    def get_base(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       base (str): base type of utilities.get_chars
+        ---------------------------------------------------
+        """
+        return self._base
+
+    def get_alphabet(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       alphabet (str): get_chars(base), a character's code is its index
+        ---------------------------------------------------
+        """
+        return self._alphabet
+
+    def get_orders(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       orders (list): n-gram sizes of the model, sorted
+        ---------------------------------------------------
+        """
+        return sorted(self._tables)
+
+    def get_table(self,n):
+        """
+        ----------------------------------------------------
+        Parameters:   n (int): n-gram size
+        Return:       table (array('f') or SparseTable): log10 probabilities
+        Description:  Dense tables are arrays of m**n floats
+                      Larger tables are sparse dictionaries that
+                          return the floor for unseen n-grams
+        Asserts:      the model has a table of size n
+        ---------------------------------------------------
+        """
+        assert n in self._tables, 'no table of size {}'.format(n)
+        return self._tables[n]
+
+    def get_frequencies(self):
+        """
+        ----------------------------------------------------
+        Parameters:   -
+        Return:       frequencies (list): probability of every alphabet character
+        Asserts:      the model has a unigram table
+        ---------------------------------------------------
+        """
+        table = self.get_table(1)
+        return [10**table[i] for i in range(len(self._alphabet))]
+
+    def encode(self,text):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str)
+        Return:       codes (list): alphabet index of every character of text
+        Description:  Characters outside the alphabet are skipped
+        ---------------------------------------------------
+        """
+        return [ord(c) for c in self._pattern.sub('',text).translate(self._translation)]
+
+    def chi_squared(self,text):
+        """
+        ----------------------------------------------------
+        Parameters:   text (str)
+        Return:       result (float)
+        Description:  Chi-squared statistics of text against the unigram table
+                      returns -1.00 if text has no alphabet characters
+        ---------------------------------------------------
+        """
+        codes = self.encode(text)
+        n = len(codes)
+        if n == 0:
+            return -1.00
+        counts = [0]*len(self._alphabet)
+        for x in codes:
+            counts[x] += 1
+        equation = 0.0
+        for i,f in enumerate(self.get_frequencies()):
+            e = f*n
+            equation += ((counts[i] - e)*(counts[i] - e)) / e
+        return equation
+
+    @staticmethod
+    def build(corpus,base='lower',orders=DEFAULT_ORDERS,processes=None,
+              chunk_size=utilities.DEFAULT_CHUNK_SIZE):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   corpus (str or list of str): corpus file name(s), UTF-8
+                      base (str): default = 'lower'
+                      orders (tuple): n-gram sizes, default = (1,2,4)
+                      processes (int): worker processes, default = None (one per core)
+                          1 counts in this process
+                      chunk_size (int): bytes per task, default = 1 MB
+        Return:       model (LanguageModel)
+        Description:  Streams the corpus in byte ranges of chunk_size
+                      Every range is counted by a worker, which also reads
+                          the next few characters so that n-grams crossing
+                          the end of the range are counted (once)
+                      Only counts travel back from the workers
+        Asserts:      orders are positive integers, chunk_size is positive,
+                      the corpus has at least max(orders) alphabet characters
+        ---------------------------------------------------
+        """
+        if type(corpus) == str:
+            corpus = [corpus]
+        orders = tuple(sorted(set(orders)))
+        assert len(orders) > 0 and all([type(n) == int and n > 0 for n in orders]), 'invalid orders'
+        assert type(chunk_size) == int and chunk_size > 0, 'invalid chunk_size'
+        model = LanguageModel(base)
+        tasks = []
+        for filename in corpus:
+            size = os.path.getsize(filename)
+            for start in range(0,size,chunk_size):
+                tasks.append((filename,start,min(start + chunk_size,size),base,orders))
+        counts = {n:{} for n in orders}
+        if processes == 1 or len(tasks) < 2:
+            results = (LanguageModel._count_range(*task) for task in tasks)
+            LanguageModel._merge(counts,results)
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                futures = [executor.submit(LanguageModel._count_range,*task) for task in tasks]
+                LanguageModel._merge(counts,(future.result() for future in as_completed(futures)))
+        m = len(model._alphabet)
+        for n in orders:
+            total = sum(counts[n].values())
+            assert total > 0, 'corpus is too short'
+            floor = math.log10(0.01/total)
+            if m**n <= LanguageModel.DENSE_LIMIT:
+                table = array('f',[floor])*(m**n)
+                for idx,x in counts[n].items():
+                    table[idx] = math.log10(x/total)
+            else:
+                table = SparseTable(floor)
+                table.update(zip(counts[n],array('f',[math.log10(x/total) for x in counts[n].values()])))
+            model._tables[n] = table
+        return model
+
+    @staticmethod
+    def _merge(counts,results):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   counts (dict): {n: {index: count}}, updated
+                      results: iterable of worker counts
+        Return:       -
+        Description:  Private helper function
+        ---------------------------------------------------
+        """
+        for result in results:
+            for n,part in result.items():
+                total = counts[n]
+                for idx,x in part.items():
+                    total[idx] = total.get(idx,0) + x
+        return
+
+    @staticmethod
+    def _count_range(filename,start,end,base,orders):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   filename (str)
+                      start, end (int): byte range
+                      base (str), orders (tuple)
+        Return:       counts (dict): {n: {index: count}}
+        Description:  Private helper function (run in a worker process)
+                      Counts the n-grams starting in the range
+                      A character belongs to the range of its first byte
+        ---------------------------------------------------
+        """
+        model = LanguageModel(base)
+        m = len(model._alphabet)
+        extra = max(orders) - 1
+        with open(filename,'rb') as infile:
+            infile.seek(start)
+            data = infile.read(end - start)
+            # complete the last character, skip the end of the previous one
+            tail = infile.read(3)
+            i = 0
+            while i < len(tail) and 0x80 <= tail[i] <= 0xBF:
+                i += 1
+            data += tail[:i]
+            infile.seek(end + i)
+            i = 0
+            if start > 0:
+                while i < len(data) and 0x80 <= data[i] <= 0xBF:
+                    i += 1
+            codes = model.encode(data[i:].decode('utf-8','replace'))
+            size = len(codes)
+            if extra > 0:
+                decoder = codecs.getincrementaldecoder('utf-8')('replace')
+                block = infile.read(4096)
+                while len(codes) - size < extra and block:
+                    codes += model.encode(decoder.decode(block))
+                    block = infile.read(4096)
+                codes += model.encode(decoder.decode(b'',True))
+        counts = {}
+        for n in orders:
+            total = min(size,len(codes) - n + 1)
+            values = codes[:max(total,0)]
+            for j in range(1,n):
+                values = [v*m + c for v,c in zip(values,codes[j:j + total])]
+            part = {}
+            for v in values:
+                part[v] = part.get(v,0) + 1
+            counts[n] = part
+        return counts
+
+    def save(self,filename):
+        """
+        ----------------------------------------------------
+        Parameters:   filename (str)
+        Return:       -
+        Description:  Writes the model to a binary file (little endian):
+                          magic, base, then for every table:
+                          n, dense flag, entry count, floor and
+                          the float32 values (dense)
+                          or the uint64 indexes and float32 values (sparse)
+        ---------------------------------------------------
+        """
+        base = self._base.encode('utf-8')
+        with open(filename,'wb') as outfile:
+            outfile.write(self.MAGIC)
+            outfile.write(struct.pack('<HB',len(base),len(self._tables)))
+            outfile.write(base)
+            for n in self.get_orders():
+                table = self._tables[n]
+                dense = isinstance(table,array)
+                floor = min(table) if dense else table.floor
+                outfile.write(struct.pack('<BBQd',n,dense,len(table),floor))
+                if dense:
+                    outfile.write(LanguageModel._little(table).tobytes())
+                else:
+                    keys = sorted(table)
+                    outfile.write(LanguageModel._little(array('Q',keys)).tobytes())
+                    outfile.write(LanguageModel._little(array('f',[table[k] for k in keys])).tobytes())
+        return
+
+    @staticmethod
+    def load(filename):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   filename (str): file written by LanguageModel.save
+        Return:       model (LanguageModel)
+        Description:  Reads the tables straight into arrays
+        Errors:       ValueError if filename is not a language model file
+        ---------------------------------------------------
+        """
+        with open(filename,'rb') as infile:
+            if infile.read(4) != LanguageModel.MAGIC:
+                raise ValueError('{} is not a language model file'.format(filename))
+            try:
+                length,count = struct.unpack('<HB',infile.read(3))
+                model = LanguageModel(infile.read(length).decode('utf-8'))
+                for _ in range(count):
+                    n,dense,size,floor = struct.unpack('<BBQd',infile.read(18))
+                    if dense:
+                        model._tables[n] = LanguageModel._read_array(infile,'f',size)
+                    else:
+                        keys = LanguageModel._read_array(infile,'Q',size)
+                        values = LanguageModel._read_array(infile,'f',size)
+                        table = SparseTable(floor)
+                        table.update(zip(keys,values))
+                        model._tables[n] = table
+            except (struct.error,AssertionError,UnicodeDecodeError,EOFError) as e:
+                raise ValueError('{} is not a valid language model file'.format(filename)) from e
+        return model
+
+    @staticmethod
+    def _read_array(infile,typecode,size):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   infile (file), typecode (str), size (int)
+        Return:       values (array)
+        Description:  Private helper function
+                      Reads size little endian values
+        Errors:       EOFError if the file is too short
+        ---------------------------------------------------
+        """
+        values = array(typecode)
+        values.fromfile(infile,size)
+        return LanguageModel._little(values)
+
+    @staticmethod
+    def _little(values):
+        """
+        ----------------------------------------------------
+        Static Method
+        Parameters:   values (array)
+        Return:       values (array): in little endian byte order
+        Description:  Private helper function, swaps on big endian machines
+                      (the operation is its own inverse)
+        ---------------------------------------------------
+        """
+        if sys.byteorder == 'little':
+            return values
+        values = array(values.typecode,values)
+        values.byteswap()
+        return values
+
+class SparseTable(dict):
+    """
+    ----------------------------------------------------
+    Description: Sparse n-gram table of a LanguageModel
+                 {index: log10 probability}, unseen indexes return floor
+    ----------------------------------------------------
+    """
+
+    def __init__(self,floor):
+        """
+        ----------------------------------------------------
+        Parameters:   floor (float): value of unseen n-grams
+        Description:  SparseTable constructor
+        ---------------------------------------------------
+        """
+        dict.__init__(self)
+        self.floor = floor
+
+    def __missing__(self,idx):
+        """
+        ----------------------------------------------------
+        Parameters:   idx (int): n-gram index not in the table
+        Return:       floor (float)
+        Description:  Unseen n-grams get the floor value, they are not stored
+        ---------------------------------------------------
+        """
+        return self.floor
+
+#------------------------
+# Command line interface
+#------------------------
+
+def _cli_cipher(args):
+    """
+    ----------------------------------------------------
+    Parameters:   args (Namespace): parsed command line arguments
+    Return:       cipher (Vigenere or Shift)
+    Description:  Private helper function
+                  Builds the cipher object given by --cipher and --key
+                  Shift keys are given as shifts,start_index,end_index
+    ---------------------------------------------------
+    """
+    if args.cipher == 'shift':
+        if args.key is None:
+            return Shift()
+        return Shift(_cli_shift_key(args.key))
+    if args.key is None:
+        return Vigenere()
+    return Vigenere(args.key)
+
+def _cli_shift_key(text):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str): --key value, shifts,start_index,end_index
+    Return:       key (int,int,int) or None if not three integers
+    Description:  Private helper function
+    ---------------------------------------------------
+    """
+    try:
+        key = tuple([int(x) for x in text.split(',')])
+    except ValueError:
+        return None
+    return key if len(key) == 3 else None
+
+def _cli_transform(cipher,mode,chunks):
+    """
+    ----------------------------------------------------
+    Parameters:   cipher (Vigenere or Shift)
+                  mode (str): 'encrypt' or 'decrypt'
+                  chunks (iterable of str)
+    Return:       generator of output chunks (str)
+    Description:  Private helper function
+                  Encrypts or decrypts a stream of chunks
+    ---------------------------------------------------
+    """
+    if type(cipher) == Vigenere:
+        if mode == 'encrypt':
+            return cipher.encrypt_stream(chunks)
+        return cipher.decrypt_stream(chunks)
+    if mode == 'encrypt':
+        return (cipher.encrypt(chunk) for chunk in chunks)
+    return (cipher.decrypt(chunk) for chunk in chunks)
+
+def _cli_analyze(args,chunks):
+    """
+    ----------------------------------------------------
+    Parameters:   args (Namespace): parsed command line arguments
+                  chunks (iterable of str)
+    Return:       result (str): key and key length, tab separated
+    Description:  Private helper function
+                  Vigenere: chunks are fed to a StreamingAnalyzer (constant memory)
+                  Shift: the whole text is loaded and Shift.cryptanalyze is used
+    ---------------------------------------------------
+    """
+    if args.cipher == 'shift':
+        base = args.base if args.base is not None else get_chars('lower')
+        key,plaintext = Shift.cryptanalyze(''.join(chunks),[base,-1,-1])
+        return '{}'.format(key)
+    analyzer = StreamingAnalyzer(args.max_length)
+    for chunk in chunks:
+        analyzer.feed(chunk)
+    key = analyzer.get_key()
+    return '{}\t{}'.format(key,len(key))
+
+def _cli_output_name(args,filename):
+    """
+    ----------------------------------------------------
+    Parameters:   args (Namespace): parsed command line arguments
+                  filename (str): input file
+    Return:       output filename (str)
+    Description:  Private helper function
+                  Output file has the same name as the input file
+                  and is placed in --output-dir
+                  main refuses inputs with the same name, and inputs
+                      that are already in --output-dir
+    ---------------------------------------------------
+    """
+    return os.path.join(args.output_dir,os.path.basename(filename))
+
+def _cli_run_file(args,filename):
+    """
+    ----------------------------------------------------
+    Parameters:   args (Namespace): parsed command line arguments
+                  filename (str): input file
+    Return:       result (str): line to report for this file
+    Description:  Private helper function
+                  Processes one file into --output-dir (run in a worker process)
+    ---------------------------------------------------
+    """
+    chunks = utilities.file_to_chunks(filename,args.chunk_size)
+    if args.command == 'cryptanalyze':
+        return '{}\t{}'.format(filename,_cli_analyze(args,chunks))
+    cipher = _cli_cipher(args)
+    output = _cli_output_name(args,filename)
+    index = None
+    if args.index and args.command == 'encrypt' and args.cipher == 'vigenere':
+        index = KeyPhaseIndex()
+    with open(output,'w',newline='') as outfile:
+        for chunk in _cli_transform(cipher,args.command,chunks):
+            outfile.write(chunk)
+            if index is not None:
+                index.update(chunk.encode(outfile.encoding))
+    if index is not None:
+        index.save(output)
+    return '{}\t{}'.format(filename,output)
+
+def main(argv=None):
+    """
+    ----------------------------------------------------
+    Parameters:   argv (list): command line arguments, default = sys.argv[1:]
+    Return:       exit status (int)
+    Description:  Command line entry point
+                      python Vg_Cipher.py encrypt --key KEY [files]
+                      python Vg_Cipher.py decrypt --key KEY [files]
+                      python Vg_Cipher.py cryptanalyze [files]
+                      python Vg_Cipher.py benchmark [--samples N] [--seed N]
+                      python Vg_Cipher.py batch [jobs.jsonl] > results.jsonl
+                      python Vg_Cipher.py model --model FILE [--base BASE] corpus files
+                  Reads stdin when no file is given, writes to stdout
+                  Input is read and written chunk by chunk (--chunk-size)
+                  With --output-dir, files are processed by --jobs worker processes
+                      and each output is written to a file of the same name
+    ---------------------------------------------------
+    """
+    parser = argparse.ArgumentParser(prog='Vg_Cipher.py',
+                                     description='Vigenere and Shift ciphers')
+    parser.add_argument('command',choices=['encrypt','decrypt','cryptanalyze','benchmark','batch','model'])
+    parser.add_argument('files',nargs='*',help='input files (default: stdin)')
+    parser.add_argument('-c','--cipher',choices=['vigenere','shift'],default='vigenere')
+    parser.add_argument('-k','--key',help='Vigenere keyword or Shift key as shifts,start,end')
+    parser.add_argument('-b','--base',help='Shift cryptanalysis or model base (default: lower case letters)')
+    parser.add_argument('-m','--max-length',type=int,default=StreamingAnalyzer.DEFAULT_MAX_LENGTH,
+                        help='largest Vigenere key length to consider')
+    parser.add_argument('-o','--output-dir',help='write one output file per input file')
+    parser.add_argument('-j','--jobs',type=int,default=1,
+                        help='worker processes (encrypt, decrypt and cryptanalyze: requires --output-dir)')
+    parser.add_argument('-s','--chunk-size',type=int,default=utilities.DEFAULT_CHUNK_SIZE,
+                        help='characters read at a time')
+    parser.add_argument('--index',action='store_true',
+                        help='vigenere encrypt: write a key position index next to each output file '
+                             '(requires --output-dir)')
+    parser.add_argument('-t','--timeout',type=float,default=BatchRunner.DEFAULT_TIMEOUT,
+                        help='batch: seconds per job')
+    parser.add_argument('--memory-limit',type=int,help='batch: megabytes per worker')
+    parser.add_argument('--model',help='model: language model file to write')
+    parser.add_argument('--seed',type=int,default=0,help='benchmark seed')
+    parser.add_argument('--samples',type=int,default=3,help='benchmark cases per grid point')
+    args = parser.parse_intermixed_args(argv)
+    if args.chunk_size < 1 or args.jobs < 1 or args.max_length < 1:
+        parser.error('--chunk-size, --jobs and --max-length should be positive')
+    if args.command == 'benchmark':
+        cases = GroundTruth.generate(samples=args.samples,seed=args.seed)
+        print(GroundTruth.report(GroundTruth.evaluate(cases)))
+        return 0
+    if args.command == 'batch':
+        memory_limit = None if args.memory_limit is None else args.memory_limit*1024*1024
+        runner = BatchRunner(args.jobs,args.timeout,memory_limit)
+        for source in (args.files if len(args.files) > 0 else [sys.stdin]):
+            if source is sys.stdin:
+                runner.run_jsonl(sys.stdin,sys.stdout)
+            else:
+                with open(source,'r') as infile:
+                    runner.run_jsonl(infile,sys.stdout)
+        return 0
+    if args.command == 'model':
+        if args.model is None or len(args.files) == 0:
+            parser.error('model requires --model and corpus files')
+        model = LanguageModel.build(args.files,args.base or 'lower',
+                                    processes=args.jobs,
+                                    chunk_size=args.chunk_size)
+        model.save(args.model)
+        print('{}\t{}'.format(args.model,','.join([str(n) for n in model.get_orders()])))
+        return 0
+    if args.command != 'cryptanalyze' and args.key is None:
+        parser.error('{} requires --key'.format(args.command))
+    if args.command != 'cryptanalyze':
+        if args.cipher == 'shift':
+            if not Shift.valid_key(_cli_shift_key(args.key)):
+                parser.error('invalid shift key {}: expected shifts,start,end '
+                             'with 0 <= start < end < {}'.format(args.key,len(Shift.BASE)))
+        elif not Vigenere.valid_key(args.key) or \
+                not all([c.isascii() for c in args.key if c.isalpha()]):
+            parser.error('invalid vigenere key {}: should contain English letters only '
+                         '(other characters are ignored)'.format(args.key))
+    if args.output_dir is None or len(args.files) == 0:
+        if args.jobs > 1:
+            parser.error('--jobs requires --output-dir and input files')
+        if args.index:
+            parser.error('--index requires --output-dir and input files')
+    if args.index and (args.command != 'encrypt' or args.cipher != 'vigenere'):
+        parser.error('--index is only supported by vigenere encrypt')
+    if args.output_dir is not None and args.command != 'cryptanalyze':
+        names = set()
+        for filename in args.files:
+            name = os.path.basename(filename)
+            if name in names:
+                parser.error('two input files are named {}'.format(name))
+            names.add(name)
+            output = _cli_output_name(args,filename)
+            if os.path.realpath(output) == os.path.realpath(filename):
+                parser.error('output file {} would overwrite its input'.format(output))
+
+    if args.output_dir is not None and len(args.files) > 0:
+        os.makedirs(args.output_dir,exist_ok=True)
+        if args.jobs == 1:
+            for filename in args.files:
+                print(_cli_run_file(args,filename))
+        else:
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                futures = [executor.submit(_cli_run_file,args,f) for f in args.files]
+                for future in as_completed(futures):
+                    print(future.result())
+        return 0
+
+    sources = args.files if len(args.files) > 0 else [sys.stdin]
+    for source in sources:
+        chunks = utilities.file_to_chunks(source,args.chunk_size)
+        if args.command == 'cryptanalyze':
+            result = _cli_analyze(args,chunks)
+            if source is sys.stdin:
+                print(result)
+            else:
+                print('{}\t{}'.format(source,result))
+            continue
+        for chunk in _cli_transform(_cli_cipher(args),args.command,chunks):
+            sys.stdout.write(chunk)
+        sys.stdout.flush()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
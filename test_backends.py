@@ -0,0 +1,33 @@
+#------------------------
+# Compute backend tests
+#------------------------
+# python -m pytest test_backends.py   (or python -m unittest test_backends)
+
+import unittest
+import utilities
+from Vg_Cipher import SharedCiphertext
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_backends_agree(self):
+        self.assertEqual(utilities.check_backends(trials=200,seed=1),[])
+
+    def test_shared_codes(self):
+        text = 'Vigenere cipher, shared with worker processes. ' * 50
+        codes = utilities.get_letter_codes(text)
+        with SharedCiphertext(text) as shared:
+            view = shared.get_codes()
+            for backend in utilities.BACKENDS.values():
+                for L in (1,5,12):
+                    self.assertEqual(backend.column_counts(view,L),
+                                     utilities.PythonBackend.column_counts(codes,L))
+            del view
+
+    def test_get_backend(self):
+        self.assertIs(utilities.get_backend('python'),utilities.PythonBackend)
+        self.assertIn(utilities.get_backend(),utilities.BACKENDS.values())
+
+
+if __name__ == '__main__':
+    unittest.main()
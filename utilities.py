@@ -1,4 +1,12 @@
 from math import ceil
+import re
+import os
+import random
+from operator import eq
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 ENCODINGS = ['lower','upper','alpha','lowernum','uppernum','alphanum',
              'special','nonalpha','B6','BA','pascii','unicode128','unicode256']
@@ -7,6 +15,7 @@ ENGLISH_FREQ = [0.08167,0.01492,0.02782, 0.04253, 0.12702,0.02228, 0.02015,
                 0.07507, 0.01929, 0.00095, 0.05987, 0.06327, 0.09056, 0.02758,
                 0.00978, 0.0236, 0.0015, 0.01974, 0.00074]
 PAD = 'q'
+DEFAULT_CHUNK_SIZE = 1024*1024
 
 '______________________________________________________________________________'
 
@@ -77,6 +86,88 @@ def get_chars(encoding):
         result = ''
     return result
 
+'______________________________________________________________________________'
+
+def get_index_map(base):
+    """
+    ----------------------------------------------------
+    Parameters:   base (str): stream of unique characters
+    Return:       index_map (dict): {ord(char): index}
+    Description:  Returns a map from the code point of each character in base
+                  to its index in base
+                  Maps are built once per base and then reused,
+                  so a lookup costs the same for lower and unicode256
+    Asserts:      base is a string
+    ---------------------------------------------------
+    """
+    assert type(base) == str, 'invalid input'
+    index_map = _INDEX_MAPS.get(base)
+    if index_map is None:
+        index_map = {ord(base[i]): i for i in range(len(base))}
+        _INDEX_MAPS[base] = index_map
+    return index_map
+
+_INDEX_MAPS = {}
+
+'______________________________________________________________________________'
+
+def get_letter_codes(text):
+    """
+    ----------------------------------------------------
+    Parameters:   text (str or bytes)
+    Return:       codes (bytes)
+    Description:  Returns the English letters of text as codes, one byte per letter
+                      a/A --> 0, b/B --> 1, ..., z/Z --> 25
+                  All other characters are dropped
+                  Done with bytes.translate, so no Python loop over the text
+    Asserts:      text is a string or bytes
+    ---------------------------------------------------
+    """
+    assert type(text) in (str,bytes), 'invalid input'
+    if type(text) == str:
+        text = text.encode('ascii','ignore')
+    return text.translate(_LETTER_TABLE,_NON_LETTERS)
+
+_LETTER_TABLE = bytes.maketrans(get_chars('lower').encode()+get_chars('upper').encode(),
+                                bytes(range(26))*2)
+_NON_LETTERS = bytes([i for i in range(256) if not chr(i).isalpha() or i > 127])
+
+'______________________________________________________________________________'
+
+def get_shift_tables(d='e',table_type='dict'):
+    """
+    ----------------------------------------------------
+    Parameters:   direction (str): 'e' (encryption) or 'd' (decryption)
+                  table_type (str): 'dict' or 'bytes'
+    Return:       tables (list): 26 tables, one per shift (0-25)
+    Description:  Returns the substitution tables of the English letters
+                      for every shift of a Vigenere key character
+                  Upper and lower case letters are shifted within their case
+                  'dict': {char: substitute}, other characters are not in the table
+                  'bytes': bytes.translate table, other bytes are unchanged
+                  Tables are built once and then reused
+    Asserts:      direction is 'e' or 'd', table_type is 'dict' or 'bytes'
+    ---------------------------------------------------
+    """
+    assert d in ('e','d') and table_type in ('dict','bytes'), 'invalid input'
+    tables = _SHIFT_SUBSTITUTIONS.get((d,table_type))
+    if tables is None:
+        lower = get_chars('lower')
+        upper = get_chars('upper')
+        sign = 1 if d == 'e' else -1
+        tables = []
+        for s in range(26):
+            shifted = lower[s:]+lower[:s] if sign == 1 else lower[26-s:]+lower[:26-s]
+            shifted += shifted.upper()
+            if table_type == 'dict':
+                tables.append(dict(zip(lower+upper,shifted)))
+            else:
+                tables.append(bytes.maketrans((lower+upper).encode(),shifted.encode()))
+        _SHIFT_SUBSTITUTIONS[(d,table_type)] = tables
+    return tables
+
+_SHIFT_SUBSTITUTIONS = {}
+
 '______________________________________________________________________________'
 def encode(text,encoding):
     """
@@ -94,13 +185,14 @@ def encode(text,encoding):
     if encoding not in ENCODINGS:
         print('Error(encode): invalid encoding')
         return []
-    base = get_chars(encoding)        
+    index_map = get_index_map(get_chars(encoding))
     output = []
     for c in text:
-        if c in base:
-            output.append(base.index(c))
-        else:
+        i = index_map.get(ord(c))
+        if i is None:
             output.append(c)
+        else:
+            output.append(i)
     return output
 '______________________________________________________________________________'
 def decode(codes,encoding):
@@ -148,6 +240,34 @@ def file_to_text(filename):
 
 '______________________________________________________________________________'
 
+def file_to_chunks(source,chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    ----------------------------------------------------
+    Parameters:   source (str or file): filename or an open text file (e.g. sys.stdin)
+                  chunk_size (int): characters per chunk, default = 1 MB
+    Return:       generator of chunks (str)
+    Description:  Utility function to read a file in chunks of chunk_size characters
+                  Only one chunk is held in memory at a time
+                  Line endings are kept as they are in the file
+    Asserts:      chunk_size is a positive integer
+    ---------------------------------------------------
+    """
+    assert type(chunk_size) == int and chunk_size > 0, 'invalid chunk_size'
+    if type(source) == str:
+        infile = open(source,'r',newline='')
+    else:
+        infile = source
+    try:
+        chunk = infile.read(chunk_size)
+        while chunk != '':
+            yield chunk
+            chunk = infile.read(chunk_size)
+    finally:
+        if type(source) == str:
+            infile.close()
+
+'______________________________________________________________________________'
+
 def text_to_file(text, filename):
     """
     ----------------------------------------------------
@@ -199,23 +319,41 @@ def text_to_words(text):
     Return:       word_list (list)
     Description:  Reads a given text
                   Returns a list of strings, each pertaining to a word in the text
-                  Words are separated by a white space (space, tab or newline)
+                  Words are separated by a white space (space or newline)
                   Gets rid of all special characters at the start and at the end
     Asserts:      text is a string
     ---------------------------------------------------
     """
     assert type(text) == str, 'invalid input'
+    return list(iter_words(text))
+
+'______________________________________________________________________________'
+
+def iter_words(source):
+    """
+    ----------------------------------------------------
+    Parameters:   source (str or iterable of str):
+                      a text, or the chunks of a text (e.g. output of file_to_chunks)
+    Return:       generator of words (str)
+    Description:  Yields the words of source one at a time, same words as text_to_words
+                  A word split between two chunks is joined before it is yielded
+                  Only the current chunk is held in memory
+    ---------------------------------------------------
+    """
+    if type(source) == str:
+        source = [source]
     special = get_chars('special')
-    word_list = []
-    lines = text.split('\n')
-    for line in lines:
-        line = line.strip('\n')
-        line = line.split(' ')
-        for i in range(len(line)):
-            if line[i] != '':
-                line[i] = line[i].strip(special)
-                word_list+=[line[i]]
-    return word_list
+    tail = ''
+    for chunk in source:
+        chunk = tail + chunk
+        end = max(chunk.rfind(' '),chunk.rfind('\n')) + 1
+        tail = chunk[end:]
+        for match in _WORD_PATTERN.finditer(chunk,0,end):
+            yield match.group().strip(special)
+    if tail != '':
+        yield tail.strip(special)
+
+_WORD_PATTERN = re.compile('[^ \n]+')
 
 '______________________________________________________________________________'
 
@@ -234,14 +372,31 @@ def count_matches(text, word_list):
     ---------------------------------------------------
     """
     assert type(text) == str and type(word_list) == list, 'invalid input'
-    words = text_to_words(text)
-    alphabet = get_chars('lower')
+    return count_matches_stream(text,word_list)
+
+'______________________________________________________________________________'
+
+def count_matches_stream(source, word_list):
+    """
+    ----------------------------------------------------
+    Parameters:   source (str or iterable of str): a text or its chunks
+                  word_list (list)
+    Return:       matches (int)
+                  mismatches (int)
+    Description:  Same as count_matches, but words are counted one at a time
+                  as they are produced by iter_words (constant memory)
+                  Words starting with a non English letter are mismatches
+    Asserts:      word_list is a list
+    ---------------------------------------------------
+    """
+    assert type(word_list) == list, 'invalid input'
+    index_map = get_index_map(get_chars('lower'))
     matches = 0
     mismatch = 0
-    for w in words:
+    for w in iter_words(source):
         if w.isalpha():
-            list_num = alphabet.index(w[0].lower())
-            if w.lower() in word_list[list_num]:
+            list_num = index_map.get(ord(w[0].lower()[0]))
+            if list_num is not None and w.lower() in word_list[list_num]:
                 matches+=1
             else:
                 mismatch+=1
@@ -451,6 +606,23 @@ def compare_texts(text1,text2):
 
 '______________________________________________________________________________'
 
+def bit_count(x):
+    """
+    ----------------------------------------------------
+    Parameters:   x (int): non-negative integer
+    Return:       count (int)
+    Description:  Returns number of 1 bits in x (popcount)
+                  Uses int.bit_count when available (Python 3.10+)
+    Assert:       x is a non-negative integer
+    ----------------------------------------------------
+    """
+    assert type(x) == int and x >= 0, 'invalid input'
+    if hasattr(x,'bit_count'):
+        return x.bit_count()
+    return bin(x).count('1')
+
+'______________________________________________________________________________'
+
 def frequency_analysis(text,base = ''):
     """
     ----------------------------------------------------
@@ -469,3 +641,243 @@ def frequency_analysis(text,base = ''):
     return [text.count(char) for char in base]
 
 '______________________________________________________________________________'
+
+class PythonBackend:
+    """
+    ----------------------------------------------------
+    Description: Reference compute backend, pure Python
+                 Kernels work on letter codes (output of get_letter_codes)
+                 Every other backend should give identical results
+    ----------------------------------------------------
+    """
+
+    name = 'python'
+
+    @staticmethod
+    def histogram(codes):
+        """
+        ----------------------------------------------------
+        Parameters:   codes (bytes-like): letter codes
+        Return:       counts (list): 26 letter counts
+        ---------------------------------------------------
+        """
+        codes = bytes(codes)
+        return [codes.count(i) for i in range(26)]
+
+    @staticmethod
+    def column_counts(codes,key_length):
+        """
+        ----------------------------------------------------
+        Parameters:   codes (bytes-like): letter codes
+                      key_length (int)
+        Return:       counts (2D list): key_length x 26 letter counts
+                      counts[c] is the histogram of codes c, c + key_length, ...
+        ---------------------------------------------------
+        """
+        return [PythonBackend.histogram(col) for col in PythonBackend.split_columns(codes,key_length)]
+
+    @staticmethod
+    def split_columns(codes,key_length):
+        """
+        ----------------------------------------------------
+        Parameters:   codes (bytes-like): letter codes
+                      key_length (int)
+        Return:       columns (list of bytes)
+        ---------------------------------------------------
+        """
+        return [bytes(codes[c::key_length]) for c in range(key_length)]
+
+    @staticmethod
+    def shift(codes,shifts,sign=1):
+        """
+        ----------------------------------------------------
+        Parameters:   codes (bytes-like): letter codes
+                      shifts (bytes-like): key shifts, repeated over codes
+                      sign (int): 1 (encrypt) or -1 (decrypt), default = 1
+        Return:       result (bytes): (codes[i] + sign*shifts[i % len(shifts)]) % 26
+        ---------------------------------------------------
+        """
+        codes = bytes(codes)
+        L = len(shifts)
+        result = bytearray(len(codes))
+        for c in range(min(L,len(codes))):
+            result[c::L] = codes[c::L].translate(_SHIFT_TABLES[(sign*shifts[c]) % 26])
+        return bytes(result)
+
+    @staticmethod
+    def coincidences(seq,lag):
+        """
+        ----------------------------------------------------
+        Parameters:   seq (str or bytes-like)
+                      lag (int): positive integer
+        Return:       count (int): number of i with seq[i] == seq[i+lag]
+        ---------------------------------------------------
+        """
+        if type(seq) != str:
+            seq = bytes(seq)
+        return sum(map(eq,seq[lag:],seq[:-lag])) if lag < len(seq) else 0
+
+_SHIFT_TABLES = [bytes([(x + s) % 26 for x in range(256)]) for s in range(26)]
+
+class NumpyBackend:
+    """
+    ----------------------------------------------------
+    Description: NumPy compute backend
+                 Same kernels and results as PythonBackend
+                 Available only if NumPy is installed
+    ----------------------------------------------------
+    """
+
+    name = 'numpy'
+
+    @staticmethod
+    def _array(codes):
+        """
+        ----------------------------------------------------
+        Parameters:   codes (bytes-like or numpy array)
+        Return:       array (numpy uint8 array), no copy when possible
+        Description:  Private helper function
+        ---------------------------------------------------
+        """
+        if isinstance(codes,np.ndarray):
+            return codes.astype(np.uint8,copy=False)
+        return np.frombuffer(codes,dtype=np.uint8)
+
+    @staticmethod
+    def histogram(codes):
+        """
+        ----------------------------------------------------
+        Same as PythonBackend.histogram(codes)
+        ----------------------------------------------------
+        """
+        return np.bincount(NumpyBackend._array(codes),minlength=26)[:26].tolist()
+
+    @staticmethod
+    def column_counts(codes,key_length):
+        """
+        ----------------------------------------------------
+        Same as PythonBackend.column_counts(codes,key_length)
+        ----------------------------------------------------
+        """
+        arr = NumpyBackend._array(codes)
+        L = key_length
+        rows = len(arr) // L
+        offsets = np.arange(0,26*L,26,dtype=np.int32)
+        idx = (arr[:rows*L].reshape(rows,L) + offsets).ravel()
+        total = np.bincount(idx,minlength=26*L)
+        tail = arr[rows*L:]
+        if len(tail) > 0:
+            total[:26*len(tail)] += np.bincount(tail + offsets[:len(tail)],minlength=26*len(tail))
+        return total.reshape(L,26).tolist()
+
+    @staticmethod
+    def split_columns(codes,key_length):
+        """
+        ----------------------------------------------------
+        Same as PythonBackend.split_columns(codes,key_length)
+        ----------------------------------------------------
+        """
+        arr = NumpyBackend._array(codes)
+        return [arr[c::key_length].tobytes() for c in range(key_length)]
+
+    @staticmethod
+    def shift(codes,shifts,sign=1):
+        """
+        ----------------------------------------------------
+        Same as PythonBackend.shift(codes,shifts,sign=1)
+        ----------------------------------------------------
+        """
+        arr = NumpyBackend._array(codes)
+        if len(arr) == 0:
+            return b''
+        key = np.resize(NumpyBackend._array(shifts),len(arr)).astype(np.int16)
+        return ((arr.astype(np.int16) + sign*key) % 26).astype(np.uint8).tobytes()
+
+    @staticmethod
+    def coincidences(seq,lag):
+        """
+        ----------------------------------------------------
+        Same as PythonBackend.coincidences(seq,lag)
+        ----------------------------------------------------
+        """
+        if type(seq) == str:
+            arr = np.frombuffer(seq.encode('utf-32-le'),dtype=np.uint32)
+        else:
+            arr = NumpyBackend._array(seq)
+        if lag >= len(arr):
+            return 0
+        return int(np.count_nonzero(arr[lag:] == arr[:-lag]))
+
+BACKENDS = {'python': PythonBackend}
+if np is not None:
+    BACKENDS['numpy'] = NumpyBackend
+
+'______________________________________________________________________________'
+
+def get_backend(name=None):
+    """
+    ----------------------------------------------------
+    Parameters:   name (str): 'python', 'numpy' or 'auto', default = None
+    Return:       backend (PythonBackend or NumpyBackend)
+    Description:  Returns the compute backend used by the analysis kernels
+                  If no name is given, uses the VG_BACKEND environment variable
+                  'auto' (default) selects numpy when installed, otherwise python
+    Errors:       if unknown or unavailable backend, print error msg, return python backend
+    ---------------------------------------------------
+    """
+    if name is None:
+        name = os.environ.get('VG_BACKEND','auto')
+    if name == 'auto':
+        return NumpyBackend if np is not None else PythonBackend
+    if name not in BACKENDS:
+        print('Error(get_backend): backend {} is not available'.format(name))
+        return PythonBackend
+    return BACKENDS[name]
+
+'______________________________________________________________________________'
+
+def check_backends(trials=100,seed=0):
+    """
+    ----------------------------------------------------
+    Parameters:   trials (int): random inputs per kernel, default = 100
+                  seed (int): default = 0
+    Return:       mismatches (list): [[backend,kernel,input],...]
+    Description:  Differential check of all available backends against PythonBackend
+                  Every kernel runs over the same random inputs
+                      (including empty input and inputs shorter than the key)
+                  Letter codes are given as bytes, memoryview and, with NumPy,
+                      as an array view (as passed by SharedCiphertext);
+                      results are compared to PythonBackend on bytes
+                  An empty list means all backends give identical results
+    ---------------------------------------------------
+    """
+    rng = random.Random(seed)
+    mismatches = []
+    for _ in range(trials):
+        n = rng.choice([0,1,2,7,100,rng.randint(0,5000)])
+        codes = bytes([rng.randrange(26) for _ in range(n)])
+        text = ''.join(rng.choices('aAbB1 ❤é',k=n))
+        L = rng.randint(1,30)
+        shifts = bytes([rng.randrange(26) for _ in range(rng.randint(1,12))])
+        lag = rng.randint(1,40)
+        cases = [('histogram',(codes,)),('column_counts',(codes,L)),
+                 ('split_columns',(codes,L)),('shift',(codes,shifts,1)),
+                 ('shift',(codes,shifts,-1)),('coincidences',(codes,lag)),
+                 ('coincidences',(text,lag))]
+        views = [memoryview(codes)]
+        if np is not None:
+            # a view into a larger shared buffer, as in SharedCiphertext
+            buffer = np.frombuffer(b'\x00' + codes + b'\x00',dtype=np.uint8)
+            views.append(buffer[1:n+1])
+        for kernel,args in cases:
+            expected = getattr(PythonBackend,kernel)(*args)
+            inputs = [args]
+            if args[0] is codes:
+                inputs += [(view,) + args[1:] for view in views]
+            for backend in BACKENDS.values():
+                for test_args in inputs:
+                    if backend is PythonBackend and test_args is args:
+                        continue
+                    if getattr(backend,kernel)(*test_args) != expected:
+                        mismatches.append([backend.name,kernel,test_args])
+    return mismatches